@@ -1,8 +1,23 @@
+import datetime
 from pathlib import Path
+from typing import Callable
 
+import rich
 import rich_click as click
 from mysoc_validator.models.transcripts import Chamber
+from rich.table import Table
 
+from .benchmark import (
+    StageBenchmark,
+    load_baseline,
+    reference_stage,
+    run_benchmark,
+    save_baseline,
+    vendor_fixtures,
+)
+from .bundles import BundleFormat, pack_store
+from .downloader import persistent_download_path
+from .interim import InterimFormat
 from .process import (
     delete_current_year_parquets,
     move_to_package,
@@ -11,11 +26,53 @@ from .process import (
     render_policy_days,
     render_year,
 )
+from .providers import bundle_root, default_provider
 from .snapshot import generate_all_snapshots
+from .transcript_store import migrate_store
 
 data_dir = Path(__file__).parent.parent.parent / "data"
 
 
+def render_options(command: Callable) -> Callable:
+    """
+    Options shared by every command that processes days
+    """
+    options = [
+        click.option(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes to spread days across",
+        ),
+        click.option(
+            "--force",
+            is_flag=True,
+            help="Reprocess days even if their inputs are unchanged",
+        ),
+        click.option(
+            "--interim-format",
+            type=str,
+            default=InterimFormat.ARROW,
+            help="Format for per-day results (json is larger but readable for debugging)",
+        ),
+        click.option(
+            "--timings",
+            is_flag=True,
+            help="Write per-stage timings for each day to data/processed/timings",
+        ),
+        click.option(
+            "--prefetch",
+            type=int,
+            default=0,
+            help="Download missing transcripts this many at a time while processing",
+        ),
+    ]
+    # applied last to first so they are listed in this order in --help
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
 @click.group()
 def cli():
     pass
@@ -33,59 +90,339 @@ def refresh_snapshot():
     generate_all_snapshots()
 
 
+def benchmark_table(
+    title: str,
+    stages: dict[str, StageBenchmark],
+    previous: dict[str, StageBenchmark],
+) -> Table:
+    """
+    Stage timings, with the change in each stage's speed relative to the reference
+    stage since the baseline
+    """
+    table = Table(title=title)
+    columns = ["Stage", "Seconds", "Paragraphs/s", "Decisions/s", "vs baseline"]
+    for column in columns:
+        table.add_column(column)
+    for stage in stages.values():
+        change = ""
+        if stage.stage != reference_stage and stage.stage in previous:
+            now = stage.seconds / stages[reference_stage].seconds
+            was = previous[stage.stage].seconds / previous[reference_stage].seconds
+            change = f"{was / now - 1:+.0%}"
+        table.add_row(
+            stage.stage,
+            f"{stage.seconds:.3f}",
+            f"{stage.paragraphs_per_second:,.0f}",
+            f"{stage.decisions_per_second:,.0f}",
+            change,
+        )
+    return table
+
+
+@cli.command()
+@click.option(
+    "--repeats", type=int, default=3, help="Times to run each date (fastest is kept)"
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=0.25,
+    help="Fail if a stage's throughput, relative to the parse stage, drops by more than this fraction of the baseline",
+)
+@click.option(
+    "--update-baseline", is_flag=True, help="Store this run as the new baseline"
+)
+@click.option(
+    "--vendor",
+    is_flag=True,
+    help="Copy the anchor date transcripts into data/tests/xml (gzipped) first",
+)
+def benchmark(
+    repeats: int = 3,
+    threshold: float = 0.25,
+    update_baseline: bool = False,
+    vendor: bool = False,
+):
+    """
+    Time each stage for each snapshot anchor date, using the vendored transcripts
+    """
+    if vendor:
+        vendor_fixtures()
+    try:
+        report = run_benchmark(repeats=repeats)
+    except FileNotFoundError as e:
+        rich.print(f"[red]{e}")
+        raise SystemExit(1)
+    baseline = load_baseline()
+
+    for date, result in report.by_date.items():
+        previous = baseline.by_date.get(date) if baseline else None
+        rich.print(
+            benchmark_table(
+                f"{date}: {result.paragraphs} paragraphs, {result.decisions} decisions",
+                result.stages,
+                previous.stages if previous else {},
+            )
+        )
+    rich.print(
+        benchmark_table(
+            f"Total: {report.paragraphs} paragraphs, {report.decisions} decisions",
+            report.stages,
+            baseline.stages if baseline else {},
+        )
+    )
+
+    if update_baseline:
+        save_baseline(report)
+        return
+    if baseline is None:
+        rich.print("[red]No baseline stored - run with --update-baseline to create one")
+        raise SystemExit(1)
+    if baseline.dates != report.dates:
+        rich.print(
+            "[red]Baseline covers different dates - run with --update-baseline to refresh it"
+        )
+        raise SystemExit(1)
+    regressions = report.regressions(baseline, threshold)
+    if regressions:
+        for x in regressions:
+            rich.print(
+                f"[red]{x.date} {x.stage} regressed: {x.metric} relative to "
+                f"{reference_stage} {x.baseline:.3f} -> {x.current:.3f}"
+            )
+        raise SystemExit(1)
+
+
 @cli.command()
 @click.option("--chamber", type=str, default=Chamber.COMMONS)
-def process_current_year(chamber: Chamber = Chamber.COMMONS):
+@render_options
+@click.option(
+    "--refresh-days",
+    type=int,
+    default=0,
+    help="Check the server for newer versions of transcripts from the last N days",
+)
+def process_current_year(
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+    refresh_days: int = 0,
+):
     """
     Update data for current year
     """
     chamber = Chamber(chamber)
-    render_latest(data_dir, chamber=chamber)
-    move_to_package(data_dir)
+    interim_format = InterimFormat(interim_format)
+    render_latest(
+        data_dir,
+        chamber=chamber,
+        workers=workers,
+        force=force,
+        interim_format=interim_format,
+        timings=timings,
+        prefetch=prefetch,
+        refresh_days=refresh_days,
+    )
+    move_to_package(data_dir, changed_only=True)
 
 
 @cli.command()
 @click.option("--chamber", type=str, default=Chamber.COMMONS)
-def process_historical(chamber: Chamber = Chamber.COMMONS):
+@render_options
+def process_historical(
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+):
     """
     Regenerate parquets for historical information
     """
     chamber = Chamber(chamber)
-    render_historical(data_dir, chamber=chamber)
+    interim_format = InterimFormat(interim_format)
+    render_historical(
+        data_dir,
+        chamber=chamber,
+        workers=workers,
+        force=force,
+        interim_format=interim_format,
+        timings=timings,
+        prefetch=prefetch,
+    )
     move_to_package(data_dir)
 
 
 @cli.command()
 @click.option("--chamber", type=str, default=Chamber.COMMONS)
-def process_historical_policy_days(chamber: Chamber = Chamber.COMMONS):
+@render_options
+def process_historical_policy_days(
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+):
     """
     Regenerate parquets for historical information
     """
     chamber = Chamber(chamber)
-    render_policy_days(data_dir, chamber=chamber)
+    interim_format = InterimFormat(interim_format)
+    render_policy_days(
+        data_dir,
+        chamber=chamber,
+        workers=workers,
+        force=force,
+        interim_format=interim_format,
+        timings=timings,
+        prefetch=prefetch,
+    )
     move_to_package(data_dir)
 
 
 @cli.command()
-def recreate_package():
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    help="Only re-read yearly parquets that have changed since the last run",
+)
+@click.option(
+    "--partitioned",
+    is_flag=True,
+    help="Also write datasets split by chamber and year to data/processed/partitioned",
+)
+def recreate_package(changed_only: bool = False, partitioned: bool = False):
     """
     Just create the overal parquets for packages
     """
-    move_to_package(data_dir)
+    move_to_package(data_dir, changed_only=changed_only, partitioned=partitioned)
 
 
 @cli.command()
 @click.argument("year", type=int)
 @click.option("--chamber", type=str, default=Chamber.COMMONS)
-def process_year(year: int, chamber: Chamber = Chamber.COMMONS):
+@render_options
+@click.option(
+    "--refresh-days",
+    type=int,
+    default=0,
+    help="Check the server for newer versions of transcripts from the last N days",
+)
+def process_year(
+    year: int,
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+    refresh_days: int = 0,
+):
     """
     Process an arbitary year
     """
     chamber = Chamber(chamber)
-    render_year(data_dir, year=year, chamber=chamber)
+    interim_format = InterimFormat(interim_format)
+    render_year(
+        data_dir,
+        year=year,
+        chamber=chamber,
+        workers=workers,
+        force=force,
+        interim_format=interim_format,
+        timings=timings,
+        prefetch=prefetch,
+        refresh_days=refresh_days,
+    )
     move_to_package(data_dir)
 
 
+@cli.command()
+@click.argument("year", type=int)
+@click.option("--chamber", type=str, default=Chamber.COMMONS)
+@click.option(
+    "--concurrency", type=int, default=8, help="Number of downloads to run at once"
+)
+def prefetch(year: int, chamber: Chamber = Chamber.COMMONS, concurrency: int = 8):
+    """
+    Download any missing transcripts for a year (to date) without processing them
+    """
+    chamber = Chamber(chamber)
+    start_date = datetime.date(year, 1, 1)
+    end_date = min(datetime.date(year, 12, 31), datetime.date.today())
+    dates = [
+        start_date + datetime.timedelta(days=i)
+        for i in range((end_date - start_date).days + 1)
+    ]
+    # the same provider render_year reads from, so bundled days aren't fetched
+    provider = default_provider(data_dir / "scrapedxml")
+    for _ in provider.iter_prefetch(dates, chamber, concurrency):
+        pass
+    available = provider.local_dates(chamber, year)
+    rich.print(f"{len(available)} transcripts available for {year}")
+
+
+@cli.command()
+@click.option(
+    "--decompress",
+    is_flag=True,
+    help="Convert compressed transcripts back to plain XML",
+)
+def migrate_transcripts(decompress: bool = False):
+    """
+    Compress existing transcript mirrors in place
+    """
+    for root in [data_dir / "scrapedxml", persistent_download_path()]:
+        if not root.exists():
+            continue
+        report = migrate_store(root, compress=not decompress)
+        rich.print(
+            f"{root}: {report.files} files, "
+            f"{report.bytes_before / 1e6:.1f}MB -> {report.bytes_after / 1e6:.1f}MB"
+        )
+
+
+@cli.command()
+@click.option("--chamber", type=str, default=Chamber.COMMONS)
+@click.option(
+    "--year",
+    type=int,
+    multiple=True,
+    help="Year to pack (can be repeated) - defaults to every year before this one",
+)
+@click.option(
+    "--format",
+    "bundle_format",
+    type=str,
+    default=BundleFormat.ZIP,
+    help="Bundle format (zip or tar)",
+)
+def pack_transcripts(
+    chamber: Chamber = Chamber.COMMONS,
+    year: tuple[int, ...] = (),
+    bundle_format: BundleFormat = BundleFormat.ZIP,
+):
+    """
+    Pack the local transcript store into one bundle per year
+    """
+    chamber = Chamber(chamber)
+    bundle_format = BundleFormat(bundle_format)
+    store_root = data_dir / "scrapedxml"
+    written = pack_store(
+        store_root / chamber,
+        bundle_root(store_root) / chamber,
+        years=list(year) or None,
+        bundle_format=bundle_format,
+    )
+    for path in written:
+        rich.print(f"Packed {path}")
+
+
 @cli.command()
 def remove_current_year_parquets():
     """
@@ -20,7 +20,7 @@ from mysoc_validator.models.transcripts import (
 )
 from pydantic import BaseModel, computed_field
 
-from .detector import PhraseDetector
+from .detector import DetectorSet, PhraseDetector
 from .enum_helpers import StrEnum
 from .motions import Motion
 
@@ -281,6 +281,13 @@ not_agreement_based_on_previous = PhraseDetector(
     ]
 )
 
+# everything get_agreements checks each paragraph against
+agreement_detectors = DetectorSet(
+    agreement_made=agreement_made,
+    motion_amendment_agreed=motion_amendment_agreed,
+    amended_agreement=amended_agreement,
+)
+
 
 def get_divisions(
     chamber: Chamber, transcript: Transcript, date_str: str
@@ -354,12 +361,13 @@ def get_agreements(
             except IndexError:
                 next_paragraph = ""
 
+            hits = agreement_detectors(paragraph)
             end_reason = None
-            if agreement_made(paragraph):
+            if hits["agreement_made"]:
                 end_reason = "one_line_agreement"
-            if motion_amendment_agreed(paragraph):
+            if hits["motion_amendment_agreed"]:
                 end_reason = "amendment_agreed"
-            if amended_agreement(paragraph):
+            if hits["amended_agreement"]:
                 end_reason = "amended_motion_agreed"
 
             if end_reason and not_agreement_based_on_previous(previous_paragraph):
@@ -375,7 +383,7 @@ def get_agreements(
                     major_heading_title=major_heading_text,
                     speech_id=transcript_group.speech.id,
                     paragraph_pid=paragraph.pid or f"para/{index}",
-                    agreed_text=str(paragraph),
+                    agreed_text=hits.text.raw,
                     preceeding_text=previous_paragraph,
                     after_text=next_paragraph,
                 )
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import datetime
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from mysoc_validator import Transcript
+from mysoc_validator.models.transcripts import Chamber, Speech
+from pydantic import BaseModel, Field
+
+from .mapper import MotionMapper
+from .providers import default_provider
+from .snapshot import anchor_dates, debates_path, tests_path
+from .timing import StageTimer
+from .transcript_store import read_transcript, transcript_glob, write_transcript
+
+fixtures_path = tests_path / "xml"
+baseline_path = tests_path / "benchmark_baseline.json"
+
+benchmark_stages = ["parse", "get_motions", "get_agreements", "get_divisions", "assign"]
+
+# stage every other stage is measured against, to cancel out how fast the machine is
+reference_stage = "parse"
+
+# throughputs checked for regressions
+benchmark_metrics = ["paragraphs_per_second", "decisions_per_second"]
+
+
+class StageBenchmark(BaseModel):
+    stage: str
+    seconds: float
+    paragraphs_per_second: float
+    decisions_per_second: float
+
+
+class DateBenchmark(BaseModel):
+    date: str
+    paragraphs: int
+    decisions: int
+    stages: dict[str, StageBenchmark] = Field(default_factory=dict)
+
+    @classmethod
+    def from_seconds(
+        cls, date: str, paragraphs: int, decisions: int, seconds: dict[str, float]
+    ) -> DateBenchmark:
+        benchmark = cls(date=date, paragraphs=paragraphs, decisions=decisions)
+        for stage, stage_seconds in seconds.items():
+            benchmark.stages[stage] = StageBenchmark(
+                stage=stage,
+                seconds=stage_seconds,
+                paragraphs_per_second=paragraphs / stage_seconds,
+                decisions_per_second=decisions / stage_seconds,
+            )
+        return benchmark
+
+    def relative(
+        self, stage: str, metric: str, reference: str = reference_stage
+    ) -> float:
+        """
+        A stage's throughput as a fraction of the reference stage's paragraphs/s.
+        This stays roughly the same from machine to machine.
+        """
+        return getattr(self.stages[stage], metric) / (
+            self.stages[reference].paragraphs_per_second
+        )
+
+
+@dataclass
+class Regression:
+    date: str
+    stage: str
+    metric: str
+    # throughput relative to the reference stage
+    baseline: float
+    current: float
+
+
+class BenchmarkReport(BaseModel):
+    dates: list[str]
+    paragraphs: int
+    decisions: int
+    # totals over every date
+    stages: dict[str, StageBenchmark] = Field(default_factory=dict)
+    by_date: dict[str, DateBenchmark] = Field(default_factory=dict)
+
+    def regressions(
+        self,
+        baseline: BenchmarkReport,
+        threshold: float,
+        reference: str = reference_stage,
+    ) -> list[Regression]:
+        """
+        Stages whose throughput relative to the reference stage has dropped by more
+        than threshold (0.25 = 25%) on any date, for any of the benchmark metrics
+        """
+        slow = []
+        for date, current in self.by_date.items():
+            previous = baseline.by_date.get(date)
+            if previous is None or reference not in previous.stages:
+                continue
+            for stage in current.stages:
+                if stage == reference or stage not in previous.stages:
+                    continue
+                for metric in benchmark_metrics:
+                    was = previous.relative(stage, metric, reference)
+                    now = current.relative(stage, metric, reference)
+                    if now < was * (1 - threshold):
+                        slow.append(Regression(date, stage, metric, was, now))
+        return slow
+
+
+def fixture_path(date: str, fixtures: Path = fixtures_path) -> Path:
+    matches = sorted(
+        path
+        for pattern in transcript_glob(f"*{date}*.xml")
+        for path in fixtures.glob(pattern)
+    )
+    if not matches:
+        raise FileNotFoundError(
+            f"No benchmark fixture for {date} in {fixtures} - run `project benchmark --vendor`"
+        )
+    return matches[-1]
+
+
+def vendor_fixtures(dates: list[str] = anchor_dates, fixtures: Path = fixtures_path):
+    """
+    Copy the transcripts for the benchmark dates into the repo
+    so the benchmark can run without a network connection
+    """
+    provider = default_provider(debates_path / "scrapedxml")
+    for date in dates:
+        source = provider.latest(datetime.date.fromisoformat(date))
+        write_transcript(fixtures / source.name, source.read_bytes(), compress=True)
+
+
+def count_paragraphs(transcript: Transcript) -> int:
+    return sum(len(x.items) for x in transcript.items if isinstance(x, Speech))
+
+
+def time_date(
+    date: str, fixtures: Path = fixtures_path, data_dir: Path = debates_path
+) -> tuple[StageTimer, int, int]:
+    """
+    Run a single anchor date through the pipeline.
+    Returns the timer along with the paragraph and decision counts.
+    """
+    path = fixture_path(date, fixtures)
+    timer = StageTimer(date, str(Chamber.COMMONS))
+    with timer.stage("parse"):
+        transcript = read_transcript(path)
+    paragraphs = count_paragraphs(transcript)
+    mapper = MotionMapper(transcript, date, Chamber.COMMONS, data_dir, timer=timer)
+    decisions = len(mapper.found_divisions) + len(mapper.found_agreements)
+    with timer.stage("assign"):
+        mapper.assign()
+    return timer, paragraphs, decisions
+
+
+def run_benchmark(
+    dates: list[str] = anchor_dates,
+    repeats: int = 3,
+    fixtures: Path = fixtures_path,
+    data_dir: Path = debates_path,
+) -> BenchmarkReport:
+    """
+    Time each stage for each anchor date.
+    The fastest of the repeats is kept for each date to reduce noise.
+    """
+    report = BenchmarkReport(dates=dates, paragraphs=0, decisions=0)
+    for date in dates:
+        best: dict[str, float] = {}
+        for _ in range(repeats):
+            timer, paragraphs, decisions = time_date(date, fixtures, data_dir)
+            for timing in timer.timings:
+                best[timing.stage] = min(
+                    best.get(timing.stage, timing.seconds), timing.seconds
+                )
+        report.by_date[date] = DateBenchmark.from_seconds(
+            date,
+            paragraphs,
+            decisions,
+            {stage: best[stage] for stage in benchmark_stages},
+        )
+        report.paragraphs += paragraphs
+        report.decisions += decisions
+
+    totals = DateBenchmark.from_seconds(
+        "total",
+        report.paragraphs,
+        report.decisions,
+        {
+            stage: sum(x.stages[stage].seconds for x in report.by_date.values())
+            for stage in benchmark_stages
+        },
+    )
+    report.stages = totals.stages
+    return report
+
+
+def load_baseline(path: Path = baseline_path) -> Optional[BenchmarkReport]:
+    if not path.exists():
+        return None
+    return BenchmarkReport.model_validate_json(path.read_text())
+
+
+def save_baseline(report: BenchmarkReport, path: Path = baseline_path):
+    path.write_text(json.dumps(report.model_dump(), indent=2))
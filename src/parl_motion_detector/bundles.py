@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from functools import cached_property, lru_cache
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from .enum_helpers import StrEnum
+from .local_index import parse_transcript_name
+from .transcript_store import compressed_suffix
+
+
+class BundleFormat(StrEnum):
+    # members are stored whole, so any one can be read without the rest
+    ZIP = "zip"
+    TAR = "tar"
+
+
+class Bundle(ABC):
+    """
+    A year of a chamber's transcripts in one file, read in place
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @abstractmethod
+    def names(self) -> list[str]: ...
+
+    @cached_property
+    def by_date(self) -> dict[str, list[str]]:
+        """
+        Transcript members by the date in their name
+        """
+        index: dict[str, list[str]] = {}
+        for name in self.names():
+            parts = parse_transcript_name(PurePosixPath(name).name)
+            if parts is not None:
+                index.setdefault(parts[1], []).append(name)
+        return index
+
+    @abstractmethod
+    def read(self, member: str) -> bytes: ...
+
+
+class ZipBundle(Bundle):
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.zip = zipfile.ZipFile(path)
+
+    def names(self) -> list[str]:
+        return self.zip.namelist()
+
+    def read(self, member: str) -> bytes:
+        return self.zip.read(member)
+
+
+class TarBundle(Bundle):
+    """
+    Uncompressed tar read through a member index of offsets and sizes.
+    Building the index means reading every header, so it is kept next to
+    the bundle until the bundle changes.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self.members = self.load_index()
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def index_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".members.json")
+
+    def load_index(self) -> dict[str, tuple[int, int]]:
+        stat = self.path.stat()
+        key = [stat.st_size, stat.st_mtime_ns]
+        index_path = self.index_path()
+        if index_path.exists():
+            data = json.loads(index_path.read_text())
+            if data["bundle"] == key:
+                return {name: tuple(x) for name, x in data["members"].items()}
+        with tarfile.open(self.path, "r:") as tar:
+            members = {
+                x.name: (x.offset_data, x.size) for x in tar.getmembers() if x.isfile()
+            }
+        index_path.write_text(json.dumps({"bundle": key, "members": members}))
+        return members
+
+    def names(self) -> list[str]:
+        return list(self.members)
+
+    def read(self, member: str) -> bytes:
+        offset, size = self.members[member]
+        # pread doesn't move a shared file position, so threads can share the fd
+        return os.pread(self.fd, size, offset)
+
+
+bundle_types: dict[str, type[Bundle]] = {
+    BundleFormat.ZIP: ZipBundle,
+    BundleFormat.TAR: TarBundle,
+}
+
+
+@lru_cache
+def process_bundle(path: Path, pid: int) -> Bundle:
+    return bundle_types[path.suffix[1:]](path)
+
+
+def open_bundle(path: Path) -> Bundle:
+    # an open file can't be shared with a forked worker, so each process has its own
+    return process_bundle(path, os.getpid())
+
+
+def bundle_paths(chamber_root: Path, year: Optional[int] = None) -> list[Path]:
+    """
+    Bundles for a chamber (for just one year if given)
+    """
+    pattern = "*" if year is None else f"{year}.*"
+    return sorted(
+        x for x in chamber_root.glob(pattern) if x.suffix[1:] in list(BundleFormat)
+    )
+
+
+def pack_store(
+    store_path: Path,
+    chamber_root: Path,
+    years: Optional[list[int]] = None,
+    bundle_format: BundleFormat = BundleFormat.ZIP,
+) -> list[Path]:
+    """
+    Pack a chamber's local store into one bundle per year, laid out as in the store.
+    Unless years are given the current year is left out, as its transcripts
+    are still changing.
+    Members are copied as stored, so gzipped transcripts aren't recompressed.
+    """
+    by_year: dict[int, list[Path]] = {}
+    for path in sorted(store_path.rglob("*.xml*")):
+        if not (path.name.endswith(".xml") or path.name.endswith(".xml.gz")):
+            continue
+        parts = parse_transcript_name(path.name)
+        if parts is None:
+            continue
+        by_year.setdefault(int(parts[1][:4]), []).append(path)
+
+    if years is None:
+        current_year = datetime.date.today().year
+        years = [x for x in by_year if x < current_year]
+
+    chamber_root.mkdir(parents=True, exist_ok=True)
+    written = []
+    for year in sorted(years):
+        if year not in by_year:
+            continue
+        bundle_path = chamber_root / f"{year}.{bundle_format}"
+        partial = bundle_path.with_name(bundle_path.name + ".part")
+        if bundle_format == BundleFormat.ZIP:
+            with zipfile.ZipFile(partial, "w") as bundle:
+                for path in by_year[year]:
+                    bundle.write(
+                        path,
+                        path.relative_to(store_path).as_posix(),
+                        compress_type=zipfile.ZIP_STORED
+                        if path.name.endswith(compressed_suffix)
+                        else zipfile.ZIP_DEFLATED,
+                    )
+        else:
+            with tarfile.open(partial, "w") as bundle:
+                for path in by_year[year]:
+                    bundle.add(path, path.relative_to(store_path).as_posix())
+        os.replace(partial, bundle_path)
+        written.append(bundle_path)
+    return written
@@ -1,8 +1,20 @@
+from __future__ import annotations
+
 import re
-from typing import Callable, NewType, Protocol, Union
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, NewType, Optional, Protocol, Union
 
 from pydantic import BaseModel, field_validator
 
+# optional - literal criteria are checked one at a time without it
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 LowerStr = NewType("LowerStr", str)
 Checker = Callable[[str], bool]
 
@@ -15,14 +27,280 @@ def process_text(text: str) -> LowerStr:
     return LowerStr(text.lower().strip())
 
 
+class NormalisedText:
+    """
+    A paragraph's text in each of the forms detectors check, so it is
+    normalised once however many detectors look at it.
+    Non-breaking spaces are replaced unless replace_nbsp is False.
+    """
+
+    def __init__(self, item: Union[str, Stringifiable], replace_nbsp: bool = True):
+        self.item = item
+        self.raw = str(item)
+        self.replace_nbsp = replace_nbsp
+        self.text = self.raw.replace("\xa0", " ") if replace_nbsp else self.raw
+        self.lower = process_text(self.text)
+        # needed by most detectors, so made up front rather than on first use
+        self.lower_no_space = self.lower.replace(" ", "")
+        # every form detectors check comes from text, so results can be shared
+        # with any other paragraph with the same text
+        self.results = detector_memo.results_for(self.text)
+
+    @cached_property
+    def lower_unstripped(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def lowered(self) -> NormalisedText:
+        """
+        The lowered text as a paragraph of its own (what nested detectors see)
+        """
+        return NormalisedText(self.lower, replace_nbsp=False)
+
+    @cached_property
+    def with_nbsp(self) -> NormalisedText:
+        """
+        The same paragraph with non-breaking spaces left in place
+        """
+        if not self.replace_nbsp:
+            return self
+        return NormalisedText(self.item, replace_nbsp=False)
+
+
+def normalise(text: Union[str, Stringifiable, NormalisedText]) -> NormalisedText:
+    if isinstance(text, NormalisedText):
+        return text
+    return NormalisedText(text)
+
+
 class StartsWith:
     def __init__(self, criteria: str):
         self.criteria = criteria.lower()
 
-    def __call__(self, paragraph: str) -> bool:
+    def __call__(self, paragraph: Union[str, NormalisedText]) -> bool:
+        if isinstance(paragraph, NormalisedText):
+            return paragraph.lower_unstripped.startswith(self.criteria)
         return paragraph.lower().startswith(self.criteria)
 
 
+# below this many literals, checking each in turn is quicker than an automaton
+automaton_min_literals = 16
+
+# flags that mean something other than at the start of the whole pattern
+global_flag_pattern = re.compile(r"\(\?[aiLmsux]+\)")
+backreference_pattern = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class LiteralSet:
+    """
+    Finds whether any of a set of strings is in a text
+    """
+
+    def __init__(self, literals: list[str]):
+        self.literals = tuple(dict.fromkeys(literals))
+        # an empty string is in everything
+        self.match_all = "" in self.literals
+        self.automaton = None
+        if ahocorasick and len(self.literals) >= automaton_min_literals:
+            self.automaton = ahocorasick.Automaton()
+            for literal in self.literals:
+                self.automaton.add_word(literal, literal)
+            self.automaton.make_automaton()
+
+    def search(self, text: str) -> bool:
+        if self.match_all:
+            return True
+        if self.automaton is not None:
+            return next(self.automaton.iter(text), None) is not None
+        for literal in self.literals:
+            if literal in text:
+                return True
+        return False
+
+
+def can_merge(pattern: re.Pattern) -> bool:
+    """
+    Whether a pattern matches the same text as part of an alternation.
+    Only those anchored to the start are merged - an alternation of
+    unanchored patterns loses re's literal prefix search and is slower.
+    """
+    return (
+        isinstance(pattern.pattern, str)
+        and pattern.pattern.startswith("^")
+        and not pattern.flags & (re.MULTILINE | re.VERBOSE)
+        and not global_flag_pattern.search(pattern.pattern)
+        and not backreference_pattern.search(pattern.pattern)
+    )
+
+
+def merge_patterns(patterns: list[re.Pattern]) -> list[re.Pattern]:
+    """
+    Fold anchored patterns with the same flags into one alternation
+    """
+    by_flags: dict[int, list[re.Pattern]] = {}
+    merged = []
+    for pattern in patterns:
+        if can_merge(pattern):
+            by_flags.setdefault(pattern.flags, []).append(pattern)
+        else:
+            merged.append(pattern)
+    for flags, group in by_flags.items():
+        if len(group) == 1:
+            merged.extend(group)
+            continue
+        try:
+            merged.append(
+                re.compile("|".join(f"(?:{x.pattern})" for x in group), flags)
+            )
+        except re.error:
+            # e.g. the same group name in two patterns
+            merged.extend(group)
+    return merged
+
+
+class CompiledCriteria:
+    """
+    A detector's criteria grouped so each kind is checked in one go:
+    literals with spaces against the text with spaces removed, other literals
+    against the lowered text, and regexes anchored to the start as one
+    alternation. Anything else is called in order after those.
+    """
+
+    def __init__(self, criteria: list[Any]):
+        self.source = list(criteria)
+        spaced = []
+        unspaced = []
+        patterns = []
+        # each checker with the form of the text it is given
+        # (None for the NormalisedText itself)
+        self.checkers: list[tuple[Callable[[Any], bool], Optional[str]]] = []
+        # whether the result depends only on the text - a callable may depend on
+        # more, and a nested detector can change without this one noticing
+        self.memoisable = True
+        for criterion in criteria:
+            if isinstance(criterion, str):
+                # a phrase is in the text only if it is there once spaces are removed,
+                # so the check with spaces is never needed
+                if " " in criterion:
+                    spaced.append(criterion.replace(" ", ""))
+                else:
+                    unspaced.append(criterion)
+            elif isinstance(criterion, re.Pattern):
+                patterns.append(criterion)
+            elif isinstance(criterion, ComplexPhrase):
+                self.checkers.append((criterion.score_normalised, "lowered"))
+                self.memoisable = False
+            elif isinstance(criterion, StartsWith):
+                self.checkers.append((criterion, None))
+            elif callable(criterion):
+                self.checkers.append((criterion, "text"))
+                self.memoisable = False
+        self.spaced = LiteralSet(spaced) if spaced else None
+        self.unspaced = LiteralSet(unspaced) if unspaced else None
+        self.patterns = merge_patterns(patterns)
+
+    def score(self, text: NormalisedText) -> bool:
+        if self.unspaced is not None and self.unspaced.search(text.lower):
+            return True
+        if self.spaced is not None and self.spaced.search(text.lower_no_space):
+            return True
+        for pattern in self.patterns:
+            if pattern.search(text.lower):
+                return True
+        for checker, form in self.checkers:
+            if checker(text if form is None else getattr(text, form)):
+                return True
+        return False
+
+
+@dataclass
+class MemoStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __add__(self, other: MemoStats) -> MemoStats:
+        return MemoStats(
+            self.hits + other.hits,
+            self.misses + other.misses,
+            self.evictions + other.evictions,
+        )
+
+    def __sub__(self, other: MemoStats) -> MemoStats:
+        return MemoStats(
+            self.hits - other.hits,
+            self.misses - other.misses,
+            self.evictions - other.evictions,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), "
+            f"{self.evictions} evictions"
+        )
+
+
+class DetectorMemo:
+    """
+    Process-wide LRU of detector results for short paragraphs, keyed by
+    their text. Procedural boilerplate ("Question put and agreed to.") recurs
+    on every sitting day, so its results are kept across days rather than
+    rechecked. Longer paragraphs are almost never repeated and aren't kept.
+
+    Each text's results are keyed on the detector's compiled criteria, which
+    are replaced when the criteria change, so old results are never used
+    again and go when the text is evicted.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_length: int = 160):
+        self.max_entries = max_entries
+        self.max_length = max_length
+        self.entries: OrderedDict[str, dict[CompiledCriteria, bool]] = OrderedDict()
+        self.stats = MemoStats()
+        self.lock = threading.Lock()
+
+    def results_for(self, text: str) -> Optional[dict[CompiledCriteria, bool]]:
+        """
+        The shared results for a text (None if it isn't kept)
+        """
+        if not self.max_entries or len(text) > self.max_length:
+            return None
+        with self.lock:
+            results = self.entries.get(text)
+            if results is not None:
+                self.entries.move_to_end(text)
+                return results
+            results = self.entries[text] = {}
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+            return results
+
+    def score(self, compiled: CompiledCriteria, text: NormalisedText) -> bool:
+        if text.results is None or not compiled.memoisable:
+            return compiled.score(text)
+        hit = text.results.get(compiled)
+        if hit is None:
+            hit = text.results[compiled] = compiled.score(text)
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return hit
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats = MemoStats()
+
+
+detector_memo = DetectorMemo()
+
+
 class PhraseDetector(BaseModel):
     criteria: list[Union[str, re.Pattern, Checker]]
 
@@ -36,31 +314,30 @@ class PhraseDetector(BaseModel):
                 new_criteria.append(criterion)
         return new_criteria
 
+    @cached_property
+    def compiled_criteria(self) -> CompiledCriteria:
+        return CompiledCriteria(self.criteria)
+
+    def compiled(self) -> CompiledCriteria:
+        """
+        The criteria compiled on first use, and again if they are changed
+        """
+        compiled = self.compiled_criteria
+        if compiled.source != self.criteria:
+            del self.compiled_criteria
+            compiled = self.compiled_criteria
+        return compiled
+
+    def score_normalised(self, text: NormalisedText) -> bool:
+        return detector_memo.score(self.compiled(), text)
+
     def score(self, text: str) -> bool:
-        lower_text = process_text(text)
-        lower_no_space = lower_text.replace(" ", "")
-        for criterion in self.criteria:
-            if isinstance(criterion, str):
-                if " " in criterion:
-                    strip_space = criterion.replace(" ", "")
-                    if strip_space in lower_no_space:
-                        return True
-                if criterion in lower_text:
-                    return True
-            elif isinstance(criterion, re.Pattern):
-                if criterion.search(lower_text):
-                    return True
-            elif isinstance(criterion, ComplexPhrase):
-                if criterion.score(lower_text):
-                    return True
-            elif callable(criterion):
-                if criterion(text):
-                    return True
-        return False
+        return self.score_normalised(NormalisedText(text, replace_nbsp=False))
 
-    def __call__(self, text: Union[str, Stringifiable]) -> bool:
-        txt = str(text).replace("\xa0", " ")
-        return self.score(txt)
+    def __call__(self, text: Union[str, Stringifiable, NormalisedText]) -> bool:
+        if not isinstance(text, NormalisedText):
+            text = NormalisedText(text)
+        return detector_memo.score(self.compiled(), text)
 
 
 class ComplexPhrase(BaseModel):
@@ -73,8 +350,49 @@ class ComplexPhrase(BaseModel):
     positive: PhraseDetector
     negative: PhraseDetector
 
+    def score_normalised(self, text: NormalisedText) -> bool:
+        return self.positive.score_normalised(
+            text
+        ) and not self.negative.score_normalised(text)
+
     def score(self, text: str) -> bool:
-        return self.positive.score(text) and not self.negative.score(text)
+        return self.score_normalised(NormalisedText(text, replace_nbsp=False))
+
+    def __call__(self, text: Union[str, Stringifiable, NormalisedText]) -> bool:
+        # unlike PhraseDetector, non-breaking spaces are left alone
+        return self.score_normalised(normalise(text).with_nbsp)
+
+
+class DetectorHits(dict[str, bool]):
+    """
+    Which of a set's detectors match a paragraph.
+    Each detector is checked the first time it is looked up, so a state machine
+    only pays for the ones it reaches and never checks one twice.
+    """
+
+    def __init__(
+        self,
+        detectors: dict[str, PhraseDetector],
+        item: Union[str, Stringifiable, NormalisedText],
+    ):
+        super().__init__()
+        self.detectors = detectors
+        self.text = normalise(item)
+
+    def __missing__(self, name: str) -> bool:
+        hit = self[name] = self.detectors[name].score_normalised(self.text)
+        return hit
+
+
+class DetectorSet:
+    """
+    A named group of detectors checked against the same paragraphs.
+    The paragraph is normalised once for the whole group, rather than by
+    each detector.
+    """
+
+    def __init__(self, **detectors: PhraseDetector):
+        self.detectors = detectors
 
-    def __call__(self, text: Union[str, Stringifiable]) -> bool:
-        return self.score(str(text))
+    def __call__(self, item: Union[str, Stringifiable, NormalisedText]) -> DetectorHits:
+        return DetectorHits(self.detectors, item)
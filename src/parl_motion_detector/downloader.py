@@ -1,29 +1,523 @@
+from __future__ import annotations
+
 import asyncio
+import base64
 import datetime
+import hashlib
+import importlib.util
+import os
+import queue
+import random
+import re
+import socket
 import tempfile
+import threading
+import time
+import weakref
+from functools import lru_cache
 from pathlib import Path
-from typing import ClassVar, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    ClassVar,
+    Coroutine,
+    Iterator,
+    Optional,
+    TypeVar,
+)
 
 import httpx
-import nest_asyncio
 from mysoc_validator.models.popolo import Chamber
 from pydantic import BaseModel
 
 from .enum_helpers import MiniEnum, StrEnum
+from .local_index import TranscriptIndex, get_index, parse_transcript_name
+from .transcript_store import (
+    TranscriptUnavailableError,
+    logical_path,
+    stored_path,
+    transcript_writer,
+)
 
-nest_asyncio.apply()
+T = TypeVar("T")
 
 
 def persistent_download_path():
     return Path(tempfile.gettempdir()) / "parl_motion_detector"
 
 
+class ClientSettings(BaseModel):
+    """
+    Settings for the shared HTTP client used for all downloads
+    """
+
+    max_connections: int = 10
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 30.0
+    connect_timeout: float = 15.0
+    # only used if the optional h2 package is installed
+    http2: bool = True
+    user_agent: str = "parl_motion_detector"
+    # token bucket shared by every request in the process
+    # render_year's worker processes each take an equal share of it
+    requests_per_second: float = 10.0
+    burst: int = 10
+    # retries for throttling, server errors and timeouts
+    max_retries: int = 5
+    # fetching a body again after it was cut short or failed its checks
+    # (each attempt's request already has the retries above)
+    body_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 60.0
+
+
+client_settings = ClientSettings()
+
+# statuses worth trying again after a pause
+retry_statuses = {429, 500, 502, 503, 504}
+
+# statuses that mean there's no such transcript
+not_found_statuses = {404, 410}
+
+
+class TransientDownloadError(TranscriptUnavailableError):
+    """
+    The server couldn't be reached or kept failing after all retries
+    """
+
+
+class IncompleteDownloadError(Exception):
+    """
+    A response body didn't match the length or digest the server sent
+    """
+
+
+class TokenBucket:
+    """
+    Rate limit shared across threads and event loops.
+    Tokens refill at rate per second up to burst.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, returning how long to wait before it can be used
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+# number of processes downloading at once - each gets this share of the rate limit
+rate_limit_share: int = 1
+
+
+def share_rate_limit(processes: int):
+    """
+    Split the rate limit between this many processes, as each has its own bucket.
+    Called in each render_year worker so the workers together keep to the limit.
+    """
+    global rate_limit_share
+    rate_limit_share = max(1, processes)
+    get_bucket.cache_clear()
+
+
+@lru_cache
+def get_bucket() -> TokenBucket:
+    return TokenBucket(
+        client_settings.requests_per_second / rate_limit_share,
+        max(1, client_settings.burst // rate_limit_share),
+    )
+
+
+# the bucket's lock may have been held by another thread at the time of a fork
+os.register_at_fork(after_in_child=get_bucket.cache_clear)
+
+
+def backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """
+    Full jitter exponential backoff, unless the server said how long to wait
+    """
+    settings = client_settings
+    retry_after = response.headers.get("Retry-After") if response else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), settings.backoff_max)
+    return random.uniform(
+        0, min(settings.backoff_max, settings.backoff_base * 2**attempt)
+    )
+
+
+def is_unresolvable(error: httpx.TransportError) -> bool:
+    """
+    The host name couldn't be looked up, so retrying won't help (e.g. offline)
+    """
+    cause: Optional[BaseException] = error
+    while cause is not None:
+        if isinstance(cause, socket.gaierror):
+            return True
+        cause = cause.__cause__ or cause.__context__
+    return False
+
+
+async def async_request(
+    method: str,
+    url: str,
+    headers: Optional[dict[str, str]] = None,
+    stream: bool = False,
+) -> httpx.Response:
+    """
+    Make a rate limited request with the shared client.
+    Throttling, server errors and timeouts are retried with backoff, and raise
+    TransientDownloadError if they persist. A host name that can't be resolved
+    raises straight away. Any other response (including 404)
+    is returned for the caller to interpret.
+    With stream, the body hasn't been read and the caller must close the response.
+    """
+    settings = client_settings
+    for attempt in range(settings.max_retries + 1):
+        await get_bucket().acquire()
+        response = None
+        client = get_client()
+        try:
+            request = client.build_request(method, url, headers=headers)
+            response = await client.send(request, stream=stream)
+        except httpx.TransportError as e:
+            problem = f"{type(e).__name__}: {e}"
+            if is_unresolvable(e):
+                break
+        else:
+            if response.status_code not in retry_statuses:
+                return response
+            await response.aclose()
+            problem = f"HTTP {response.status_code}"
+        if attempt < settings.max_retries:
+            await asyncio.sleep(backoff_delay(attempt, response))
+    raise TransientDownloadError(
+        f"{method} {url} failed after {attempt + 1} attempts ({problem})"
+    )
+
+
+# an AsyncClient is tied to the event loop it was first used in
+# so there is one long lived client per loop
+clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def create_client() -> httpx.AsyncClient:
+    settings = client_settings
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        http2=settings.http2 and importlib.util.find_spec("h2") is not None,
+        headers={"User-Agent": settings.user_agent},
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Client for the running event loop.
+    Connections to theyworkforyou are kept alive and reused across dates,
+    chambers and transcript types.
+    """
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None or client.is_closed:
+        client = clients[loop] = create_client()
+    return client
+
+
+async def close_client():
+    """
+    Close the running event loop's client (a new one is made if needed)
+    """
+    client = clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def configure_client(settings: ClientSettings):
+    """
+    Change the settings for the shared clients - existing clients are dropped
+    """
+    global client_settings
+    client_settings = settings
+    get_bucket.cache_clear()
+    if get_background_loop.cache_info().currsize:
+        run_sync(close_client())
+    clients.clear()
+
+
+@lru_cache
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop on a daemon thread that runs the sync wrappers.
+    Because it outlives each call its client keeps connections open between calls,
+    and it works whether or not the caller is already inside an event loop.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="downloader", daemon=True).start()
+    return loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result()
+
+
+# a forked worker doesn't get the parent's loop thread, so needs its own
+os.register_at_fork(after_in_child=get_background_loop.cache_clear)
+
+
+class Discovery(StrEnum):
+    # fetch the directory listing once and look dates up in it
+    INDEX = "index"
+    # HEAD request for every letter version of every date
+    PROBE = "probe"
+
+
+# how download_for_date finds the latest version of a day
+DISCOVERY: Discovery = Discovery.INDEX
+
+# directory listings fetched this run
+# cleared at the start of each render_year and prefetch_range
+index_cache: dict[str, list[str]] = {}
+dated_index_cache: dict[tuple[str, str], dict[str, list[str]]] = {}
+
+
+def clear_index_cache():
+    index_cache.clear()
+    dated_index_cache.clear()
+
+
+async def async_get_xmls_from_index(index_url: str) -> list[str]:
+    if index_url not in index_cache:
+        response = await async_request("GET", index_url)
+        response.raise_for_status()
+        index_cache[index_url] = re.findall(r'<a href="([^"]+\.xml)">', response.text)
+    return index_cache[index_url]
+
+
+def get_xmls_from_index(index_url: str) -> list[str]:
+    return run_sync(async_get_xmls_from_index(index_url))
+
+
+def parse_dated_index(links: list[str], file_prefix: str) -> dict[str, list[str]]:
+    """
+    Date -> sorted file names for each version of that day in a directory listing
+    """
+    pattern = re.compile(
+        rf"^{re.escape(file_prefix)}(\d{{4}}-\d{{2}}-\d{{2}})([a-z]?)\.xml$"
+    )
+    index: dict[str, list[str]] = {}
+    for link in links:
+        match = pattern.match(link)
+        if match and match.group(2) in XMLManager.letter_options:
+            index.setdefault(match.group(1), []).append(link)
+    return {date: sorted(links) for date, links in index.items()}
+
+
+async def async_get_dated_index(
+    index_url: str, file_prefix: str
+) -> dict[str, list[str]]:
+    key = (index_url, file_prefix)
+    if key not in dated_index_cache:
+        links = await async_get_xmls_from_index(index_url)
+        dated_index_cache[key] = parse_dated_index(links, file_prefix)
+    return dated_index_cache[key]
+
+
+async def async_get_scot_debate_xmls(debate_date: datetime.date) -> Optional[str]:
+    scot_debate_index = TranscriptXMl.SCOTTISH_PARLIAMENT_DEBATES.index_url()
+    links = await async_get_xmls_from_index(scot_debate_index)
+    debate_str = debate_date.isoformat()
+    matches = sorted(link for link in links if debate_str in link)
+    if matches:
+        return scot_debate_index + matches[-1]
+    return None
+
+
+def get_scot_debate_xmls(debate_date: datetime.date) -> Optional[str]:
+    return run_sync(async_get_scot_debate_xmls(debate_date))
+
+
 class TranscriptType(StrEnum):
     DEBATES = "debates"
     WRITTEN_QUESTIONS = "written_questions"
     WRITTEN_STATEMENTS = "written_statements"
 
 
+class CacheValidators(BaseModel):
+    """
+    HTTP cache validators for a downloaded transcript,
+    stored in a sidecar file next to the XML
+    """
+
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # of the uncompressed transcript as downloaded
+    sha256: Optional[str] = None
+    length: Optional[int] = None
+
+    @staticmethod
+    def sidecar_path(file_path: Path) -> Path:
+        # keyed on the plain name, so compressing a file keeps its validators
+        file_path = logical_path(file_path)
+        return file_path.with_name(file_path.name + ".meta.json")
+
+    @classmethod
+    def from_response(
+        cls,
+        response: httpx.Response,
+        sha256: Optional[str] = None,
+        length: Optional[int] = None,
+    ) -> CacheValidators:
+        return cls(
+            url=str(response.url),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            sha256=sha256,
+            length=length,
+        )
+
+    @classmethod
+    def from_file(cls, file_path: Path) -> Optional[CacheValidators]:
+        path = cls.sidecar_path(file_path)
+        if not path.exists():
+            return None
+        return cls.model_validate_json(path.read_text())
+
+    def to_file(self, file_path: Path):
+        self.sidecar_path(file_path).write_text(self.model_dump_json(indent=2))
+
+    def request_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def sent_sha256(response: httpx.Response) -> Optional[bytes]:
+    """
+    SHA-256 the server sent for the body in a Repr-Digest or Digest header, if any
+    """
+    for header in ("Repr-Digest", "Digest"):
+        for value in response.headers.get_list(header, split_commas=True):
+            algorithm, _, encoded = value.strip().partition("=")
+            if algorithm.lower() == "sha-256":
+                return base64.b64decode(encoded.strip(":"))
+    return None
+
+
+def check_integrity(response: httpx.Response, digest: bytes):
+    """
+    Compare a streamed body with the length and digest in the headers.
+    Both describe the bytes on the wire, so are only checked against the
+    decoded body when there's no content encoding.
+    """
+    expected_length = response.headers.get("Content-Length")
+    if expected_length and int(expected_length) != response.num_bytes_downloaded:
+        raise IncompleteDownloadError(
+            f"{response.url} sent {response.num_bytes_downloaded} bytes "
+            f"of {expected_length}"
+        )
+    if response.headers.get("Content-Encoding", "identity") != "identity":
+        return
+    expected_digest = sent_sha256(response)
+    if expected_digest is not None and expected_digest != digest:
+        raise IncompleteDownloadError(f"{response.url} failed its digest check")
+
+
+async def async_stream_to_store(
+    response: httpx.Response, file_path: Path
+) -> CacheValidators:
+    """
+    Stream a response body into the transcript store a chunk at a time.
+    The stored copy is only replaced once the whole body has arrived and
+    passed its checks.
+    """
+    digest = hashlib.sha256()
+    length = 0
+    with transcript_writer(file_path) as f:
+        async for chunk in response.aiter_bytes():
+            digest.update(chunk)
+            length += len(chunk)
+            f.write(chunk)
+        check_integrity(response, digest.digest())
+    return CacheValidators.from_response(response, digest.hexdigest(), length)
+
+
+async def async_download_file(
+    url: str, file_path: Path, validators: Optional[CacheValidators] = None
+) -> bool:
+    """
+    Download url to the transcript store at file_path, storing the validators
+    alongside it.
+    If validators are given, the request is conditional and False is returned
+    (leaving the file alone) if the server says it is unchanged.
+    A body cut short or failing its checks is fetched again.
+    Raises FileNotFoundError if the server says there's no such file,
+    and TranscriptUnavailableError for any other error status.
+    """
+    headers = validators.request_headers() if validators else {}
+    settings = client_settings
+    for attempt in range(settings.body_retries + 1):
+        response = await async_request("GET", url, headers=headers, stream=True)
+        try:
+            if response.status_code == 304:
+                return False
+            if response.status_code in not_found_statuses:
+                raise FileNotFoundError(
+                    f"{url} not found (HTTP {response.status_code})"
+                )
+            if not response.is_success:
+                raise TranscriptUnavailableError(
+                    f"GET {url} returned HTTP {response.status_code}"
+                )
+            stored = await async_stream_to_store(response, file_path)
+        except (httpx.TransportError, IncompleteDownloadError) as e:
+            problem = f"{type(e).__name__}: {e}"
+        else:
+            stored.to_file(file_path)
+            return True
+        finally:
+            await response.aclose()
+        if attempt < settings.body_retries:
+            await asyncio.sleep(backoff_delay(attempt))
+    raise TransientDownloadError(
+        f"GET {url} failed after {settings.body_retries + 1} attempts ({problem})"
+    )
+
+
+def download_file(
+    url: str, file_path: Path, validators: Optional[CacheValidators] = None
+) -> bool:
+    return run_sync(async_download_file(url, file_path, validators))
+
+
 class XMLManager(BaseModel):
     twfy_base_url: ClassVar[str] = "https://www.theyworkforyou.com/pwdata/"
     letter_options: ClassVar[list[str]] = [
@@ -60,27 +554,200 @@ class XMLManager(BaseModel):
     def construct_url(self, date: datetime.date, letter: str = ""):
         return f"{self.twfy_base_url}{self.relative_path}{self.file_structure_pre_date}{date.isoformat()}{letter}.xml"
 
-    def download_for_date(
+    def index_url(self) -> str:
+        return f"{self.twfy_base_url}{self.relative_path}"
+
+    async def async_find_latest_url(self, date: datetime.date) -> Optional[str]:
+        """
+        URL of the latest version of a day's transcript, if there is one
+        """
+        if DISCOVERY == Discovery.INDEX:
+            try:
+                index = await async_get_dated_index(
+                    self.index_url(), self.file_structure_pre_date
+                )
+            except httpx.HTTPStatusError:
+                # no listing for this directory - fall back to checking each letter
+                pass
+            else:
+                versions = index.get(date.isoformat())
+                return self.index_url() + versions[-1] if versions else None
+
+        all_urls = [self.construct_url(date, letter) for letter in self.letter_options]
+        valid_urls = sorted(await async_check_urls_exist(all_urls))
+        return valid_urls[-1] if valid_urls else None
+
+    def find_latest_url(self, date: datetime.date) -> Optional[str]:
+        return run_sync(self.async_find_latest_url(date))
+
+    async def async_latest_url(self, date: datetime.date) -> Optional[str]:
+        if self.chamber_type == Chamber.SCOTLAND:
+            return await async_get_scot_debate_xmls(date)
+        return await self.async_find_latest_url(date)
+
+    def latest_url(self, date: datetime.date) -> Optional[str]:
+        return run_sync(self.async_latest_url(date))
+
+    def local_versions(
         self, date: datetime.date, download_path: Optional[Path] = None
+    ) -> list[Path]:
+        """
+        Versions of a day already downloaded (plain or compressed), oldest first.
+        """
+        index, directory, prefix, suffixes = self.local_index(download_path)
+        return index.versions(directory, date.isoformat(), prefix, suffixes)
+
+    def local_dates(
+        self, year: Optional[int] = None, download_path: Optional[Path] = None
+    ) -> list[str]:
+        """
+        Dates with a transcript already downloaded, optionally within a year
+        """
+        index, directory, prefix, suffixes = self.local_index(download_path)
+        return index.dates(directory, year, prefix, suffixes)
+
+    def record_missing(self, date: datetime.date, download_path: Optional[Path] = None):
+        """
+        Note in the local index that the server has no transcript for a day
+        (as of today), so offline runs can tell it from one not yet downloaded
+        """
+        index, directory, prefix, _ = self.local_index(download_path)
+        index.mark_missing(
+            directory, date.isoformat(), prefix, datetime.date.today().isoformat()
+        )
+
+    def missing_checked(
+        self, date: datetime.date, download_path: Optional[Path] = None
+    ) -> Optional[datetime.date]:
+        """
+        When the server last said it had no transcript for a day, if it has
+        """
+        index, directory, prefix, _ = self.local_index(download_path)
+        checked = index.missing_checked(directory, date.isoformat(), prefix)
+        return datetime.date.fromisoformat(checked) if checked else None
+
+    def local_index(
+        self, download_path: Optional[Path] = None
+    ) -> tuple[TranscriptIndex, Path, Optional[str], Optional[list[str]]]:
+        """
+        Index for download_path, with the directory and the name parts
+        (before and after the date) this manager's files use.
+        Scottish transcripts don't follow the date + letter naming,
+        so are stored directly in download_path and matched on date alone.
+        """
+        download_path = download_path or persistent_download_path()
+        prefix, suffixes = self.name_parts()
+        directory = download_path / self.store_directory()
+        return get_index(download_path), directory, prefix, suffixes
+
+    def store_directory(self) -> str:
+        """
+        Where this manager's files go, relative to a download path
+        """
+        if self.chamber_type == Chamber.SCOTLAND:
+            return ""
+        return self.relative_path
+
+    def name_parts(self) -> tuple[Optional[str], Optional[list[str]]]:
+        """
+        The text before and after the date in this manager's file names
+        (None if anything goes)
+        """
+        if self.chamber_type == Chamber.SCOTLAND:
+            return None, None
+        return self.file_structure_pre_date, self.letter_options
+
+    def matches_name(self, name: str, date: Optional[str] = None) -> bool:
+        """
+        If a stored file name is one of this manager's versions (of date, if given)
+        """
+        parts = parse_transcript_name(name)
+        if parts is None:
+            return False
+        prefix, name_date, suffix = parts
+        expected_prefix, suffixes = self.name_parts()
+        return (
+            (date is None or name_date == date)
+            and (expected_prefix is None or prefix == expected_prefix)
+            and (suffixes is None or suffix in suffixes)
+        )
+
+    def local_path(
+        self, url: str, date: datetime.date, download_path: Optional[Path] = None
     ) -> Path:
-        if not download_path:
-            download_path = persistent_download_path()
-        download_path.mkdir(parents=True, exist_ok=True)
-        all_urls = [self.construct_url(date, letter) for letter in self.letter_options]
-        valid_urls = check_urls_exist(all_urls)
-        if not valid_urls:
-            raise FileNotFoundError(f"No files found for {date}")
-        valid_urls.sort()
-        latest_url = valid_urls[-1]
-        # download file to download_path
+        url_file_name = url.split("/")[-1]
+        if self.chamber_type == Chamber.SCOTLAND:
+            download_path = download_path or persistent_download_path()
+            return download_path / url_file_name
         base_path = self.construct_path(date, download_path=download_path)
-        # need to figure out the file name of the url
-        url_file_name = latest_url.split("/")[-1]
-        file_path = base_path.parent / url_file_name
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        response = httpx.get(latest_url)
-        file_path.write_text(response.text)
-        return file_path
+        return base_path.parent / url_file_name
+
+    async def async_download_for_date(
+        self, date: datetime.date, download_path: Optional[Path] = None
+    ) -> Path:
+        latest_url = await self.async_latest_url(date)
+        if not latest_url:
+            self.record_missing(date, download_path)
+            raise FileNotFoundError(f"No files found for {date}")
+        file_path = self.local_path(latest_url, date, download_path)
+        await async_download_file(latest_url, file_path)
+        return stored_path(file_path) or file_path
+
+    def download_for_date(
+        self, date: datetime.date, download_path: Optional[Path] = None
+    ) -> Path:
+        return run_sync(self.async_download_for_date(date, download_path))
+
+    async def async_refresh_for_date(
+        self, date: datetime.date, download_path: Optional[Path] = None
+    ) -> Path:
+        """
+        Check the server for a newer version of a day.
+        A new letter version is downloaded, while an existing file is revalidated
+        with a conditional request so an unchanged file costs a 304.
+        If the server can't be reached, the latest local copy is kept.
+        """
+        existing = self.local_versions(date, download_path)
+        try:
+            latest_url = await self.async_latest_url(date)
+            if not latest_url:
+                if existing:
+                    return existing[-1]
+                self.record_missing(date, download_path)
+                raise FileNotFoundError(f"No files found for {date}")
+            file_path = self.local_path(latest_url, date, download_path)
+            # files without a sidecar (or a sidecar without a file) are fetched in full
+            validators = (
+                CacheValidators.from_file(file_path) if stored_path(file_path) else None
+            )
+            await async_download_file(latest_url, file_path, validators)
+        except TranscriptUnavailableError:
+            if existing:
+                return existing[-1]
+            raise
+        return stored_path(file_path) or file_path
+
+    def refresh_for_date(
+        self, date: datetime.date, download_path: Optional[Path] = None
+    ) -> Path:
+        return run_sync(self.async_refresh_for_date(date, download_path))
+
+    async def async_get_latest_for_date(
+        self,
+        date: datetime.date,
+        download_path: Optional[Path] = None,
+        *,
+        force_download: bool = False,
+        refresh: bool = False,
+    ) -> Path:
+        if force_download:
+            return await self.async_download_for_date(date, download_path)
+        if refresh:
+            return await self.async_refresh_for_date(date, download_path)
+        existing = self.local_versions(date, download_path)
+        if existing:
+            return existing[-1]
+        return await self.async_download_for_date(date, download_path)
 
     def get_latest_for_date(
         self,
@@ -88,19 +755,17 @@ class XMLManager(BaseModel):
         download_path: Optional[Path] = None,
         *,
         force_download: bool = False,
+        refresh: bool = False,
     ) -> Path:
-        get_local = [
-            self.construct_path(date, letter, download_path)
-            for letter in self.letter_options
-        ]
-        # limit down to just those that exist
-        existing = [x for x in get_local if x.exists()]
-        if existing and not force_download:
-            # sort and return the latest
-            existing.sort()
+        existing = self.local_versions(date, download_path)
+        if existing and not force_download and not refresh:
+            # no need to involve the event loop for files we already have
             return existing[-1]
-        else:
-            return self.download_for_date(date, download_path=download_path)
+        return run_sync(
+            self.async_get_latest_for_date(
+                date, download_path, force_download=force_download, refresh=refresh
+            )
+        )
 
 
 class TranscriptXMl(MiniEnum[XMLManager]):
@@ -154,27 +819,40 @@ class TranscriptXMl(MiniEnum[XMLManager]):
         )
 
 
-async def async_check_file_existence(client: httpx.AsyncClient, url: str):
-    try:
-        response = await client.head(url)
-        return url, response.status_code
-    except httpx.RequestError:
-        return url, None
+async def async_check_file_existence(url: str) -> tuple[str, int]:
+    """
+    Status of a HEAD request for url.
+    Raises TransientDownloadError rather than guessing if the server can't answer.
+    """
+    response = await async_request("HEAD", url)
+    return url, response.status_code
 
 
 async def async_check_urls_exist(urls: list[str]) -> list[str]:
-    valid_urls = []
-    async with httpx.AsyncClient() as client:
-        tasks = [async_check_file_existence(client, url) for url in urls]
-        results = await asyncio.gather(*tasks)
-        for url, status_code in results:
-            if status_code == 200:
-                valid_urls.append(url)
-    return valid_urls
+    tasks = [async_check_file_existence(url) for url in urls]
+    results = await asyncio.gather(*tasks)
+    return [url for url, status_code in results if status_code == 200]
 
 
 def check_urls_exist(urls: list[str]) -> list[str]:
-    return asyncio.run(async_check_urls_exist(urls))
+    return run_sync(async_check_urls_exist(urls))
+
+
+async def async_get_latest_for_date(
+    date: datetime.date,
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+    force_download: bool = False,
+    refresh: bool = False,
+) -> Path:
+    transcript_manager = TranscriptXMl.get_transcript_manager(
+        chamber=chamber, transcript=transcript_type
+    )
+    return await transcript_manager.async_get_latest_for_date(
+        date, download_path, force_download=force_download, refresh=refresh
+    )
 
 
 def get_latest_for_date(
@@ -184,10 +862,175 @@ def get_latest_for_date(
     transcript_type: TranscriptType = TranscriptType.DEBATES,
     download_path: Optional[Path] = None,
     force_download: bool = False,
+    refresh: bool = False,
 ):
     transcript_manager = TranscriptXMl.get_transcript_manager(
         chamber=chamber, transcript=transcript_type
     )
     return transcript_manager.get_latest_for_date(
-        date, download_path, force_download=force_download
+        date, download_path, force_download=force_download, refresh=refresh
+    )
+
+
+def local_dates(
+    year: Optional[int] = None,
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+) -> list[str]:
+    transcript_manager = TranscriptXMl.get_transcript_manager(
+        chamber=chamber, transcript=transcript_type
+    )
+    return transcript_manager.local_dates(year, download_path)
+
+
+async def async_download_for_date(
+    date: datetime.date,
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+) -> Path:
+    transcript_manager = TranscriptXMl.get_transcript_manager(
+        chamber=chamber, transcript=transcript_type
+    )
+    return await transcript_manager.async_download_for_date(date, download_path)
+
+
+async def async_iter_prefetch(
+    dates: list[datetime.date],
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+    concurrency: int = 8,
+) -> AsyncIterator[tuple[datetime.date, Optional[Path]]]:
+    """
+    Make sure the transcripts for dates are available locally, downloading
+    up to concurrency at a time.
+    Yields (date, path) as each one lands so processing can start while the
+    rest are still downloading - path is None if the day couldn't be fetched,
+    either because there is no transcript or the server kept failing.
+    Which of those it was is left to the caller's own lookup.
+    """
+    transcript_manager = TranscriptXMl.get_transcript_manager(
+        chamber=chamber, transcript=transcript_type
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(date: datetime.date) -> tuple[datetime.date, Optional[Path]]:
+        async with semaphore:
+            try:
+                path = await transcript_manager.async_get_latest_for_date(
+                    date, download_path
+                )
+                return date, path
+            except (FileNotFoundError, TransientDownloadError, httpx.HTTPError):
+                return date, None
+
+    missing = []
+    for date in dates:
+        existing = transcript_manager.local_versions(date, download_path)
+        if existing:
+            yield date, existing[-1]
+        else:
+            missing.append(date)
+
+    uses_index = (
+        DISCOVERY == Discovery.INDEX
+        or transcript_manager.chamber_type == Chamber.SCOTLAND
+    )
+    if missing and uses_index:
+        # fetch the directory listing once up front, rather than in every task
+        try:
+            await async_get_xmls_from_index(transcript_manager.index_url())
+        except (TransientDownloadError, httpx.HTTPError):
+            pass
+
+    for task in asyncio.as_completed([fetch(date) for date in missing]):
+        yield await task
+
+
+def iter_prefetch(
+    dates: list[datetime.date],
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+    concurrency: int = 8,
+) -> Iterator[tuple[datetime.date, Optional[Path]]]:
+    """
+    Sync version of async_iter_prefetch.
+    The downloads run on the background loop and feed a queue that is
+    read from here, so the caller can work on each day as it lands.
+    """
+    landed: queue.Queue[Optional[tuple[datetime.date, Optional[Path]]]] = queue.Queue()
+
+    async def feed():
+        try:
+            async for item in async_iter_prefetch(
+                dates,
+                chamber=chamber,
+                transcript_type=transcript_type,
+                download_path=download_path,
+                concurrency=concurrency,
+            ):
+                landed.put(item)
+        finally:
+            landed.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(feed(), get_background_loop())
+    while (item := landed.get()) is not None:
+        yield item
+    # raise anything that went wrong in the feed
+    future.result()
+
+
+async def async_prefetch_range(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+    concurrency: int = 8,
+) -> list[Path]:
+    """
+    Download any missing transcripts between two dates (inclusive)
+    """
+    clear_index_cache()
+    days = (end_date - start_date).days + 1
+    dates = [start_date + datetime.timedelta(days=i) for i in range(days)]
+    found = [
+        path
+        async for _, path in async_iter_prefetch(
+            dates,
+            chamber=chamber,
+            transcript_type=transcript_type,
+            download_path=download_path,
+            concurrency=concurrency,
+        )
+    ]
+    return sorted(path for path in found if path)
+
+
+def prefetch_range(
+    start_date: datetime.date,
+    end_date: datetime.date,
+    *,
+    chamber: Chamber = Chamber.COMMONS,
+    transcript_type: TranscriptType = TranscriptType.DEBATES,
+    download_path: Optional[Path] = None,
+    concurrency: int = 8,
+) -> list[Path]:
+    return run_sync(
+        async_prefetch_range(
+            start_date,
+            end_date,
+            chamber=chamber,
+            transcript_type=transcript_type,
+            download_path=download_path,
+            concurrency=concurrency,
+        )
     )
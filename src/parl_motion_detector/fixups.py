@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from mysoc_validator import Transcript
+from mysoc_validator.models.transcripts import Chamber
+from pydantic import BaseModel, TypeAdapter
+
+if TYPE_CHECKING:
+    from .providers import TranscriptSource
+
+
+class TranscriptFixup(BaseModel):
+    """
+    A correction to the raw XML of a transcript, applied before parsing.
+    Without a chamber it applies to all of them.
+    date is matched as a prefix, so can be a full date, a month, a year or
+    left empty for every day.
+    """
+
+    chamber: Optional[Chamber] = None
+    date: str = ""
+    find: str
+    replace: str
+    note: str = ""
+
+
+@lru_cache
+def get_fixups(data_dir: Path) -> list[TranscriptFixup]:
+    path = Path(data_dir, "raw", "transcript_fixups.json")
+    if not path.exists():
+        return []
+    return TypeAdapter(list[TranscriptFixup]).validate_json(path.read_text())
+
+
+def fixups_for_day(
+    data_dir: Path, chamber: Chamber, debate_date: str
+) -> list[TranscriptFixup]:
+    return [
+        x
+        for x in get_fixups(data_dir)
+        if x.chamber in (None, chamber) and debate_date.startswith(x.date)
+    ]
+
+
+def fixups_hash(fixups: list[TranscriptFixup]) -> str:
+    if not fixups:
+        return ""
+    data = TypeAdapter(list[TranscriptFixup]).dump_json(fixups)
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_transcript(
+    source: TranscriptSource, fixups: list[TranscriptFixup]
+) -> Transcript:
+    """
+    Parse a transcript, applying any fixups to the text in memory.
+    The stored copy is left unchanged.
+    """
+    if not fixups:
+        return source.read()
+    txt = source.read_text()
+    for fixup in fixups:
+        txt = txt.replace(fixup.find, fixup.replace)
+    return Transcript.model_validate_xml(txt)
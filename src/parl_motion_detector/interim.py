@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar, get_origin
+
+import pyarrow as pa
+from pydantic import BaseModel
+
+from .agreements import Agreement, DivisionHolder
+from .enum_helpers import StrEnum
+from .motions import Motion
+
+if TYPE_CHECKING:
+    from .mapper import ResultsHolder
+
+RH = TypeVar("RH", bound="ResultsHolder")
+
+
+class InterimFormat(StrEnum):
+    ARROW = "arrow"
+    JSON = "json"
+
+    @property
+    def suffix(self) -> str:
+        return f".{self.value}"
+
+
+def model_struct(model: type[BaseModel]) -> pa.StructType:
+    """
+    Arrow struct for a model's stored fields.
+    The optional motion on a decision is replaced with an index into the day's motions.
+    """
+    fields = []
+    for name, info in model.model_fields.items():
+        if name == "motion":
+            fields.append(pa.field("motion_index", pa.int32()))
+        elif get_origin(info.annotation) is list:
+            fields.append(pa.field(name, pa.list_(pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.struct(fields)
+
+
+# The JSON form of a ResultsHolder repeats the full motion inside every decision.
+# The Arrow form stores each day as a single row, with each motion held once
+# and decisions pointing to it by position.
+interim_schema = pa.schema(
+    [
+        ("date", pa.string()),
+        ("chamber", pa.string()),
+        ("motions", pa.list_(model_struct(Motion))),
+        ("division_motions", pa.list_(model_struct(DivisionHolder))),
+        ("agreement_motions", pa.list_(model_struct(Agreement))),
+    ]
+)
+
+# lz4 is a little larger than zstd but much quicker to read back
+write_options = pa.ipc.IpcWriteOptions(compression="lz4")
+
+
+def write_arrow(results: ResultsHolder, path: Path):
+    motions: list[dict[str, Any]] = []
+    # gid -> indexes of motions stored with that gid
+    # (distinct motions can occasionally share a gid, so check content too)
+    motion_lookup: dict[str, list[int]] = {}
+
+    def motion_index(motion: Motion | None) -> int | None:
+        if motion is None:
+            return None
+        data = motion.model_dump(mode="json", exclude={"gid"})
+        for index in motion_lookup.get(motion.gid, []):
+            if motions[index] == data:
+                return index
+        motions.append(data)
+        motion_lookup.setdefault(motion.gid, []).append(len(motions) - 1)
+        return len(motions) - 1
+
+    def decision_row(decision: Agreement | DivisionHolder) -> dict[str, Any]:
+        data = decision.model_dump(mode="json", exclude={"gid", "negative", "motion"})
+        data["motion_index"] = motion_index(decision.motion)
+        return data
+
+    row = {
+        "date": results.date,
+        "chamber": str(results.chamber),
+        "division_motions": [decision_row(x) for x in results.division_motions],
+        "agreement_motions": [decision_row(x) for x in results.agreement_motions],
+        "motions": motions,
+    }
+    table = pa.Table.from_pylist([row], schema=interim_schema)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, interim_schema, options=write_options) as writer:
+            writer.write_table(table)
+
+
+def struct_rows(column: pa.ChunkedArray) -> list[dict[str, Any]]:
+    """
+    Convert a list-of-struct column from a single row table into dictionaries.
+    Going field by field is quicker than converting the structs row by row.
+    """
+    structs = column.chunk(0).flatten()
+    names = [field.name for field in structs.type]
+    values = [field.to_pylist() for field in structs.flatten()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def read_arrow(cls: type[RH], path: Path) -> RH:
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    # validate each motion once and share it between the decisions that use it
+    motions = [Motion.model_validate(x) for x in struct_rows(table.column("motions"))]
+
+    def restore_motion(decision: dict[str, Any]) -> dict[str, Any]:
+        index = decision.pop("motion_index")
+        decision["motion"] = motions[index] if index is not None else None
+        return decision
+
+    return cls(
+        date=table.column("date")[0].as_py(),
+        chamber=table.column("chamber")[0].as_py(),
+        division_motions=[
+            restore_motion(x) for x in struct_rows(table.column("division_motions"))
+        ],
+        agreement_motions=[
+            restore_motion(x) for x in struct_rows(table.column("agreement_motions"))
+        ],
+    )
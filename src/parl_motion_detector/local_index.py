@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .transcript_store import compressed_suffix, logical_path, read_transcript_bytes
+
+index_name = ".transcript_index.sqlite"
+
+# directory mtimes this recent may not yet reflect a change made in the same
+# clock tick, so the directory is rescanned next time rather than trusted
+racy_seconds = 2.0
+
+transcript_name_pattern = re.compile(
+    rf"^(.*?)(\d{{4}}-\d{{2}}-\d{{2}})(.*)\.xml(?:{re.escape(compressed_suffix)})?$"
+)
+
+
+def parse_transcript_name(name: str) -> Optional[tuple[str, str, str]]:
+    """
+    The text before the date, the date and the text after it (e.g. the letter
+    version) of a stored transcript's file name
+    """
+    match = transcript_name_pattern.match(name)
+    if match is None:
+        return None
+    return match.group(1), match.group(2), match.group(3)
+
+
+schema = """
+create table if not exists files (
+    directory text not null,
+    name text not null,
+    logical_name text not null,
+    date text not null,
+    prefix text not null,
+    suffix text not null,
+    size integer not null,
+    mtime_ns integer not null,
+    sha256 text,
+    primary key (directory, name)
+);
+create index if not exists files_by_date on files (directory, date);
+create table if not exists directories (
+    directory text primary key,
+    mtime_ns integer
+);
+create table if not exists missing (
+    directory text not null,
+    prefix text not null,
+    date text not null,
+    checked text not null,
+    primary key (directory, prefix, date)
+);
+"""
+
+
+class TranscriptIndex:
+    """
+    SQLite index of the transcripts under a download path.
+    Records the date, letter version, size and hash of each file so looking
+    up a day's versions or a year's dates is a query rather than a set of stats.
+
+    A directory is only rescanned when its mtime changes, which any file being
+    added, removed or renamed into place (as downloads are) does.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        root.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # used from both the caller's thread and the downloader's loop thread
+        self.db = sqlite3.connect(
+            root / index_name, timeout=30, check_same_thread=False
+        )
+        with self.lock, self.db:
+            # WAL keeps journal files from changing the root's mtime on every write
+            self.db.execute("pragma journal_mode=wal")
+            self.db.executescript(schema)
+
+    def key(self, directory: Path) -> str:
+        return directory.relative_to(self.root).as_posix()
+
+    def sync(self, directory: Path):
+        """
+        Bring the index for a directory up to date if it has changed
+        """
+        key = self.key(directory)
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        with self.lock:
+            row = self.db.execute(
+                "select mtime_ns from directories where directory = ?", (key,)
+            ).fetchone()
+            if row is not None and mtime_ns is not None and row[0] == mtime_ns:
+                return
+            self.scan(directory, key, mtime_ns)
+
+    def scan(self, directory: Path, key: str, mtime_ns: Optional[int]):
+        on_disk = {}
+        if mtime_ns is not None:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    match = transcript_name_pattern.match(entry.name)
+                    if match and entry.is_file():
+                        on_disk[entry.name] = match
+        known = {
+            name
+            for (name,) in self.db.execute(
+                "select name from files where directory = ?", (key,)
+            )
+        }
+        if mtime_ns is not None and time.time_ns() - mtime_ns < racy_seconds * 1e9:
+            mtime_ns = None
+        with self.db:
+            self.db.executemany(
+                "delete from files where directory = ? and name = ?",
+                [(key, name) for name in known - on_disk.keys()],
+            )
+            new_rows = []
+            for name in on_disk.keys() - known:
+                match = on_disk[name]
+                try:
+                    stat = (directory / name).stat()
+                except FileNotFoundError:
+                    continue
+                new_rows.append(
+                    (
+                        key,
+                        name,
+                        logical_path(Path(name)).name,
+                        match.group(2),
+                        match.group(1),
+                        match.group(3),
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    )
+                )
+            self.db.executemany(
+                "insert into files (directory, name, logical_name, date, prefix, "
+                "suffix, size, mtime_ns) values (?, ?, ?, ?, ?, ?, ?, ?)",
+                new_rows,
+            )
+            self.db.execute(
+                "insert or replace into directories values (?, ?)", (key, mtime_ns)
+            )
+
+    def query(
+        self,
+        directory: Path,
+        where: str,
+        params: tuple,
+        prefix: Optional[str],
+        suffixes: Optional[list[str]],
+    ) -> list[tuple[str, str, str]]:
+        self.sync(directory)
+        sql = "select date, logical_name, name from files where directory = ? and "
+        sql += where
+        args = [self.key(directory), *params]
+        if prefix is not None:
+            sql += " and prefix = ?"
+            args.append(prefix)
+        if suffixes is not None:
+            sql += f" and suffix in ({', '.join('?' * len(suffixes))})"
+            args.extend(suffixes)
+        with self.lock:
+            return self.db.execute(sql, args).fetchall()
+
+    def versions(
+        self,
+        directory: Path,
+        date: str,
+        prefix: Optional[str] = None,
+        suffixes: Optional[list[str]] = None,
+    ) -> list[Path]:
+        """
+        Stored files for each version of a day in directory, oldest first.
+        prefix and suffixes restrict the text before and after the date in the name.
+        """
+        rows = self.query(directory, "date = ?", (date,), prefix, suffixes)
+        by_version: dict[str, str] = {}
+        for _, logical_name, name in sorted(rows):
+            # if both forms exist, the compressed one is the stored copy
+            if logical_name not in by_version or name.endswith(compressed_suffix):
+                by_version[logical_name] = name
+        return sorted(directory / name for name in by_version.values())
+
+    def dates(
+        self,
+        directory: Path,
+        year: Optional[int] = None,
+        prefix: Optional[str] = None,
+        suffixes: Optional[list[str]] = None,
+    ) -> list[str]:
+        """
+        Dates with at least one stored file in directory, optionally within a year
+        """
+        if year is None:
+            rows = self.query(directory, "1", (), prefix, suffixes)
+        else:
+            rows = self.query(
+                directory, "date like ?", (f"{year}-%",), prefix, suffixes
+            )
+        return sorted({date for date, _, _ in rows})
+
+    def mark_missing(
+        self, directory: Path, date: str, prefix: Optional[str], checked: str
+    ):
+        """
+        Record that the server had no transcript for a day when checked
+        """
+        with self.lock, self.db:
+            self.db.execute(
+                "insert or replace into missing values (?, ?, ?, ?)",
+                (self.key(directory), prefix or "", date, checked),
+            )
+
+    def missing_checked(
+        self, directory: Path, date: str, prefix: Optional[str]
+    ) -> Optional[str]:
+        """
+        When the server last said it had no transcript for a day, if it has
+        """
+        with self.lock:
+            row = self.db.execute(
+                "select checked from missing "
+                "where directory = ? and prefix = ? and date = ?",
+                (self.key(directory), prefix or "", date),
+            ).fetchone()
+        return row[0] if row else None
+
+    def file_hash(self, path: Path) -> str:
+        """
+        SHA-256 of a transcript's uncompressed content.
+        Recorded the first time it is asked for, and reused while the file's
+        size and mtime are unchanged.
+        """
+        stat = path.stat()
+        row = None
+        try:
+            key = self.key(path.parent)
+        except ValueError:
+            key = None
+        if key is not None:
+            self.sync(path.parent)
+            with self.lock:
+                row = self.db.execute(
+                    "select size, mtime_ns, sha256 from files "
+                    "where directory = ? and name = ?",
+                    (key, path.name),
+                ).fetchone()
+            if row is not None and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                if row[2]:
+                    return row[2]
+        digest = hashlib.sha256(read_transcript_bytes(path)).hexdigest()
+        if row is not None:
+            with self.lock, self.db:
+                self.db.execute(
+                    "update files set size = ?, mtime_ns = ?, sha256 = ? "
+                    "where directory = ? and name = ?",
+                    (stat.st_size, stat.st_mtime_ns, digest, key, path.name),
+                )
+        return digest
+
+
+@lru_cache
+def process_index(root: Path, pid: int) -> TranscriptIndex:
+    return TranscriptIndex(root)
+
+
+def get_index(root: Path) -> TranscriptIndex:
+    # a sqlite connection can't be used from a forked worker, so each process
+    # opens its own (leaving the parent's untouched)
+    return process_index(root, os.getpid())
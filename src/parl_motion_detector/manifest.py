@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.metadata
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from mysoc_validator.models.transcripts import Chamber
+from pydantic import BaseModel, Field
+
+from .fixups import TranscriptFixup, fixups_hash
+from .mapper import get_sp_manager
+
+if TYPE_CHECKING:
+    from .providers import TranscriptSource
+
+package_dir = Path(__file__).parent
+
+# modules whose contents decide what gets extracted from a transcript
+# changing any of these means every day needs to be reprocessed
+ruleset_modules = [
+    "agreements.py",
+    "detector.py",
+    "enum_helpers.py",
+    "loose.py",
+    "mapper.py",
+    "motion_title_extraction.py",
+    "motions.py",
+    "sp_motions.py",
+]
+
+
+def hash_file(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@lru_cache
+def get_ruleset_hash() -> str:
+    digest = hashlib.sha256()
+    for module in ruleset_modules:
+        digest.update(module.encode())
+        digest.update((package_dir / module).read_bytes())
+    return digest.hexdigest()
+
+
+def get_manual_links_hash(data_dir: Path) -> str:
+    # not cached, as the file can be edited between runs in the same process
+    return hash_file(Path(data_dir, "raw", "manual_motion_linking.json"))
+
+
+@lru_cache
+def get_validator_version() -> str:
+    # its models parse the transcripts, so a new release can change what's extracted
+    return importlib.metadata.version("mysoc-validator")
+
+
+@lru_cache
+def get_sp_motions_hash() -> str:
+    return hash_file(get_sp_manager().motions_path)
+
+
+class DayInputs(BaseModel):
+    """
+    Content hashes of everything that goes into processing a single day
+    """
+
+    transcript: str
+    manual_links: str
+    ruleset: str
+    fixups: str = ""
+    validator: str = ""
+    # the Scottish Parliament motions dataset - only read for that chamber
+    sp_motions: str = ""
+
+    @classmethod
+    def from_transcript(
+        cls,
+        transcript: TranscriptSource,
+        data_dir: Path,
+        fixups: list[TranscriptFixup] = [],
+        chamber: Chamber = Chamber.COMMONS,
+        manual_links: Optional[str] = None,
+    ) -> DayInputs:
+        """
+        manual_links is the hash of the manual links file, if already worked
+        out for the run
+        """
+        if manual_links is None:
+            manual_links = get_manual_links_hash(data_dir)
+        return cls(
+            # of the uncompressed content, so where it's stored changes nothing
+            transcript=transcript.sha256(),
+            manual_links=manual_links,
+            ruleset=get_ruleset_hash(),
+            fixups=fixups_hash(fixups),
+            validator=get_validator_version(),
+            sp_motions=get_sp_motions_hash() if chamber == Chamber.SCOTLAND else "",
+        )
+
+
+class ProcessingManifest(BaseModel):
+    """
+    Record of the inputs used for each day's interim results.
+    Lets us skip days where nothing has changed since they were last processed.
+    """
+
+    chamber: Chamber
+    days: dict[str, DayInputs] = Field(default_factory=dict)
+
+    @staticmethod
+    def manifest_path(data_dir: Path, chamber: Chamber) -> Path:
+        return data_dir / "interim" / f"{chamber}-manifest.json"
+
+    @classmethod
+    def from_data_dir(cls, data_dir: Path, chamber: Chamber) -> ProcessingManifest:
+        path = cls.manifest_path(data_dir, chamber)
+        if not path.exists():
+            return cls(chamber=chamber)
+        return cls.model_validate_json(path.read_text())
+
+    def to_data_dir(self, data_dir: Path):
+        path = self.manifest_path(data_dir, self.chamber)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.days = dict(sorted(self.days.items()))
+        path.write_text(self.model_dump_json(indent=2))
@@ -5,9 +5,11 @@ import re
 from functools import lru_cache
 from itertools import chain, groupby
 from pathlib import Path
-from typing import TypeVar
+from typing import Iterator, Optional, TypeVar
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import rich
 from mysoc_validator import Transcript
 from mysoc_validator.models.transcripts import Chamber, Speech
@@ -21,8 +23,10 @@ from .agreements import (
     get_agreements,
     get_divisions,
 )
+from .interim import InterimFormat, read_arrow, write_arrow
 from .motions import Flag, Motion, get_motions
 from .sp_motions import SPMotionManager
+from .timing import StageTimer
 
 # relax the requirement for matches, will allow some to slip through without motions
 # but the wheels keep turning - and to investigate turn this flag off
@@ -336,37 +340,79 @@ def remove_redundant_motions(motions: list[Motion]) -> list[Motion]:
     return non_redundant_motions
 
 
+motions_schema = pa.schema(
+    [
+        ("gid", pa.string()),
+        ("speech_id", pa.string()),
+        ("date", pa.string()),
+        ("motion_title", pa.string()),
+        ("motion_text", pa.string()),
+        ("chamber", pa.string()),
+    ]
+)
+
+division_links_schema = pa.schema(
+    [
+        ("division_gid", pa.string()),
+        ("motion_gid", pa.string()),
+        ("chamber", pa.string()),
+    ]
+)
+
+agreements_schema = pa.schema(
+    [
+        ("gid", pa.string()),
+        ("date", pa.string()),
+        ("major_heading_id", pa.string()),
+        ("minor_heading_id", pa.string()),
+        ("speech_id", pa.string()),
+        ("paragraph_pid", pa.string()),
+        ("agreed_text", pa.string()),
+        ("negative", pa.bool_()),
+        ("motion_title", pa.string()),
+        ("motion_gid", pa.string()),
+        ("chamber", pa.string()),
+    ]
+)
+
+
 class ResultsHolder(BaseModel):
     date: str
     chamber: Chamber
     division_motions: list[DivisionHolder] = Field(default_factory=list)
     agreement_motions: list[Agreement] = Field(default_factory=list)
 
-    def export_motions_parquet(self, output_dir: Path):
-        all_motions = [
+    def motion_rows(self) -> list[dict]:
+        return [
             x.motion.flat()
             for x in self.division_motions + self.agreement_motions
             if x.motion
         ]
-        df = pd.DataFrame(all_motions)
+
+    def division_link_rows(self) -> list[dict]:
+        return [
+            {
+                "division_gid": x.gid,
+                "motion_gid": x.motion_speech_id(),
+            }
+            for x in self.division_motions
+        ]
+
+    def agreement_rows(self) -> list[dict]:
+        return [x.flat() for x in self.agreement_motions]
+
+    def export_motions_parquet(self, output_dir: Path):
+        df = pd.DataFrame(self.motion_rows())
         df["chamber"] = self.chamber
         df.to_parquet(output_dir / f"{self.chamber}-{self.date}-motions.parquet")
 
     def export_divison_links(self, output_dir: Path):
-        df = pd.DataFrame(
-            [
-                {
-                    "division_gid": x.gid,
-                    "motion_gid": x.motion_speech_id(),
-                }
-                for x in self.division_motions
-            ]
-        )
+        df = pd.DataFrame(self.division_link_rows())
         df["chamber"] = self.chamber
         df.to_parquet(output_dir / f"{self.chamber}-{self.date}-division-links.parquet")
 
     def export_agreements(self, output_dir: Path):
-        df = pd.DataFrame([x.flat() for x in self.agreement_motions])
+        df = pd.DataFrame(self.agreement_rows())
         df["chamber"] = self.chamber
         df.to_parquet(output_dir / f"{self.chamber}-{self.date}-agreements.parquet")
 
@@ -377,30 +423,75 @@ class ResultsHolder(BaseModel):
         self.export_divison_links(output_dir)
         self.export_agreements(output_dir)
 
-    def to_data_dir(self, data_dir: Path):
-        if not data_dir.exists():
-            data_dir.mkdir(parents=True)
-        with (data_dir / f"{self.chamber}-{self.date}.json").open("w") as f:
-            f.write(self.model_dump_json(indent=2))
+    @staticmethod
+    def data_dir_path(
+        data_dir: Path,
+        date: str,
+        chamber: Chamber,
+        interim_format: InterimFormat = InterimFormat.ARROW,
+    ) -> Path:
+        return data_dir / f"{chamber}-{date}{InterimFormat(interim_format).suffix}"
+
+    def to_data_dir(
+        self, data_dir: Path, interim_format: InterimFormat = InterimFormat.ARROW
+    ):
+        interim_format = InterimFormat(interim_format)
+        # workers write days in parallel, so another may create it first
+        data_dir.mkdir(parents=True, exist_ok=True)
+        # only keep one copy of a day, in whichever format was last written
+        for other_format in InterimFormat:
+            other_path = self.data_dir_path(
+                data_dir, self.date, self.chamber, other_format
+            )
+            if other_format != interim_format and other_path.exists():
+                other_path.unlink()
+        path = self.data_dir_path(data_dir, self.date, self.chamber, interim_format)
+        if interim_format == InterimFormat.ARROW:
+            write_arrow(self, path)
+        else:
+            with path.open("w") as f:
+                f.write(self.model_dump_json(indent=2))
+
+    @classmethod
+    def from_path(cls, path: Path):
+        if path.suffix == InterimFormat.ARROW.suffix:
+            return read_arrow(cls, path)
+        with path.open() as f:
+            return cls.model_validate_json(f.read())
 
     @classmethod
     def from_data_dir(cls, data_dir: Path, date: str, chamber: Chamber):
-        with (data_dir / f"{chamber}-{date}.json").open() as f:
-            return cls.model_validate_json(f.read())
+        for interim_format in InterimFormat:
+            path = cls.data_dir_path(data_dir, date, chamber, interim_format)
+            if path.exists():
+                return cls.from_path(path)
+        raise FileNotFoundError(f"No interim results for {chamber} {date}")
 
     @classmethod
-    def from_data_dir_composite(cls, data_dir: Path, date: str, chamber: Chamber):
-        items: list[ResultsHolder] = []
+    def iter_data_dir(
+        cls, data_dir: Path, date: str, chamber: Chamber
+    ) -> Iterator[ResultsHolder]:
+        """
+        Load each day's results for a year (or 'custom' for pre-2019 days) one at a time
+        """
         if date == "custom":
-            file_paths = []
-            for year in range(2000, 2019):
-                file_paths.extend(data_dir.glob(f"{chamber}-{year}*.json"))
+            patterns = [f"{chamber}-{year}*" for year in range(2000, 2019)]
         else:
-            file_paths = data_dir.glob(f"{chamber}-{date}*.json")
-        for file_path in file_paths:
-            with file_path.open() as f:
-                item = cls.model_validate_json(f.read())
-                items.append(item)
+            patterns = [f"{chamber}-{date}*"]
+        suffixes = [x.suffix for x in InterimFormat]
+        file_paths = [
+            file_path
+            for pattern in patterns
+            for file_path in data_dir.glob(pattern)
+            if file_path.suffix in suffixes
+        ]
+        # sort so the composite order doesn't depend on the filesystem
+        for file_path in sorted(file_paths):
+            yield cls.from_path(file_path)
+
+    @classmethod
+    def from_data_dir_composite(cls, data_dir: Path, date: str, chamber: Chamber):
+        items = list(cls.iter_data_dir(data_dir, date, chamber))
 
         composite = cls(
             date=date,
@@ -410,10 +501,49 @@ class ResultsHolder(BaseModel):
         )
         return composite
 
+    @classmethod
+    def export_composite(
+        cls, data_dir: Path, output_dir: Path, date: str, chamber: Chamber
+    ):
+        """
+        Equivalent to from_data_dir_composite(...).export(output_dir), but streams
+        each day into the parquet files so only one day is held in memory at a time.
+        """
+        if not output_dir.exists():
+            output_dir.mkdir(parents=True)
+
+        exports = [
+            ("motions", motions_schema, cls.motion_rows),
+            ("division-links", division_links_schema, cls.division_link_rows),
+            ("agreements", agreements_schema, cls.agreement_rows),
+        ]
+
+        writers = [
+            pq.ParquetWriter(output_dir / f"{chamber}-{date}-{name}.parquet", schema)
+            for name, schema, _ in exports
+        ]
+        try:
+            for day in cls.iter_data_dir(data_dir, date, chamber):
+                for writer, (_, schema, get_rows) in zip(writers, exports):
+                    rows = get_rows(day)
+                    if not rows:
+                        continue
+                    for row in rows:
+                        row["chamber"] = chamber
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        finally:
+            for writer in writers:
+                writer.close()
+
 
 class MotionMapper:
     def __init__(
-        self, transcript: Transcript, debate_date: str, chamber: Chamber, data_dir: Path
+        self,
+        transcript: Transcript,
+        debate_date: str,
+        chamber: Chamber,
+        data_dir: Path,
+        timer: Optional[StageTimer] = None,
     ):
         # empty speeches (no content items) break assumptions in the division/agreement
         # detection that the speech before/after a division has content - so drop them
@@ -431,9 +561,18 @@ class MotionMapper:
         self.data_dir = data_dir
         self.debate_date = debate_date
         self.chamber = chamber
-        self.found_motions = get_motions(self.chamber, transcript, debate_date)
-        self.found_agreements = get_agreements(self.chamber, transcript, debate_date)
-        self.found_divisions = get_divisions(self.chamber, transcript, debate_date)
+        self.timer = timer or StageTimer(debate_date, str(chamber))
+        with self.timer.stage("get_motions") as stage:
+            self.found_motions = get_motions(self.chamber, transcript, debate_date)
+            stage.items = len(self.found_motions)
+        with self.timer.stage("get_agreements") as stage:
+            self.found_agreements = get_agreements(
+                self.chamber, transcript, debate_date
+            )
+            stage.items = len(self.found_agreements)
+        with self.timer.stage("get_divisions") as stage:
+            self.found_divisions = get_divisions(self.chamber, transcript, debate_date)
+            stage.items = len(self.found_divisions)
         self.division_assignments: list[DivisionHolder] = []
         self.agreement_assignments: list[Agreement] = []
 
@@ -8,7 +8,7 @@ if TYPE_CHECKING:
 
 from mysoc_validator.models.transcripts import Chamber
 
-from parl_motion_detector.detector import PhraseDetector
+from parl_motion_detector.detector import NormalisedText, PhraseDetector
 
 # Compile the regex pattern in advance
 disagreement_pattern = re.compile(
@@ -114,6 +114,8 @@ def extract_legislation_name(text: str):
 
 def extract_motion_title(motion: Motion) -> str:
     content = str(motion).replace("\n", " ")
+    # normalised once for all the detectors below
+    normalised = NormalisedText(content)
     # Extract the motion title from the motion object
 
     # if a scottish motion
@@ -133,7 +135,7 @@ def extract_motion_title(motion: Motion) -> str:
     if d := extract_disagreement(content):
         return d
 
-    if reasons_committee(content):
+    if reasons_committee(normalised):
         match = first_search(content, reasons_patterns)
         if match:
             amendments_text = match.group(1)
@@ -141,10 +143,10 @@ def extract_motion_title(motion: Motion) -> str:
         else:
             return "Appoint Reasons Committee"
 
-    if adjournment_debate(content):
+    if adjournment_debate(normalised):
         return f"Adjournment Debate: {motion.major_heading_title}"
 
-    if be_approved(content):
+    if be_approved(normalised):
         legislation_name = extract_legislation_name(content)
         if legislation_name:
             return f"Approve: {legislation_name}"
@@ -152,31 +154,31 @@ def extract_motion_title(motion: Motion) -> str:
     if match := suspend_standing_order.search(content):
         return f"Disapply Standing Order {match.group(1)}"
 
-    if private_sitting(content):
+    if private_sitting(normalised):
         return f"{motion.major_heading_title}: Sit in Private"
 
     prefix = ""
-    if move_amendment(content):
+    if move_amendment(normalised):
         prefix = "Amendment: "
 
-    if new_order(content):
+    if new_order(normalised):
         return f"New Order: {motion.major_heading_title}"
 
-    if second_reading(content) and not second_clause_reading(content):
+    if second_reading(normalised) and not second_clause_reading(normalised):
         return f"Second Reading: {motion.major_heading_title}"
 
-    if second_clause_reading(content):
+    if second_clause_reading(normalised):
         clause_name = motion.minor_heading_title
         bill_name = motion.major_heading_title
         return f"{bill_name}: {clause_name}"
 
-    if first_reading(content):
+    if first_reading(normalised):
         return f"First Reading: {motion.major_heading_title}"
 
-    if third_reading(content):
+    if third_reading(normalised):
         return f"Third Reading: {motion.major_heading_title}"
 
-    if leave_for_bill(content):
+    if leave_for_bill(normalised):
         return f"Leave for Bill: {motion.major_heading_title}"
 
     if motion.chamber == Chamber.SCOTLAND:
@@ -13,7 +13,13 @@ from mysoc_validator import Transcript
 from mysoc_validator.models.transcripts import Chamber
 from pydantic import BaseModel, Field, computed_field
 
-from parl_motion_detector.detector import PhraseDetector, StartsWith, Stringifiable
+from parl_motion_detector.detector import (
+    DetectorSet,
+    NormalisedText,
+    PhraseDetector,
+    StartsWith,
+    Stringifiable,
+)
 from parl_motion_detector.enum_helpers import StrEnum
 from parl_motion_detector.motion_title_extraction import extract_motion_title
 
@@ -173,7 +179,9 @@ class Motion(BaseModel):
         """
         Any extra tags to add based on the final content
         """
-        content = str(self).lower().replace("\n", " ").replace("  ", " ")
+        content = NormalisedText(
+            str(self).lower().replace("\n", " ").replace("  ", " ")
+        )
         if len(self.motion_lines) < 3:
             if abstract_motion(content):
                 self.add_flag(Flag.ABSTRACT_MOTION)
@@ -584,6 +592,30 @@ disagree_with_lords_amendment = PhraseDetector(
 )
 
 
+# everything get_motions checks each paragraph against
+motion_detectors = DetectorSet(
+    not_sp_motion_ref=not_sp_motion_ref,
+    discussion_mode=discussion_mode,
+    in_line_amendment=in_line_amendment,
+    motion_start_sequence=motion_start_sequence,
+    motion_start=motion_start,
+    malformed_motion_start=malformed_motion_start,
+    resolved_start=resolved_start,
+    signature_close=signature_close,
+    motion_amendment_jump_in=motion_amendment_jump_in,
+    amendment_explainer=amendment_explainer,
+    end_motion=end_motion,
+    one_line_motion=one_line_motion,
+    disagree_with_lords_amendment=disagree_with_lords_amendment,
+    asked_immediately=asked_immediately,
+    is_subitem=is_subitem,
+    ends_in_continuation_character=ends_in_continuation_character,
+    valid_ender_character=valid_ender_character,
+    end_on_alphanumeric=end_on_alphanumeric,
+    is_inserted=is_inserted,
+)
+
+
 class HereTest:
     def __init__(self, criteria: str):
         self.criteria = criteria.lower()
@@ -607,6 +639,7 @@ def get_motions(
     # this returns a tuple of the major heading, minor heading speech, and speech index within a sub heading
     current_motion = None
     previous_speech = None
+    next_hits = None
     transcript_groups = list(transcript.iter_headed_speeches())
     for transcript_index, transcript_group in enumerate(transcript_groups):
 
@@ -667,13 +700,20 @@ def get_motions(
             except IndexError:
                 previous_item = None
 
-            sp_motions = extract_sp_motions(str(paragraph))
+            # the next item is the next paragraph checked, so its hits are kept
+            if next_hits is not None and next_hits.text.item is paragraph:
+                hits = next_hits
+            else:
+                hits = motion_detectors(paragraph)
+            next_hits = motion_detectors(next_item)
+
+            sp_motions = extract_sp_motions(hits.text.raw)
 
             if sp_motions:
                 if (
                     not current_motion
                     and len(sp_motions) == 1
-                    and not not_sp_motion_ref(paragraph)
+                    and not hits["not_sp_motion_ref"]
                 ):
                     # try and avoid creating sp motions we'll pick up normally
                     # as amended motions are usually described in full after
@@ -691,10 +731,10 @@ def get_motions(
                         print(f"Error: {e}, junking expanded motion")
                         current_motion = None
 
-            if discussion_mode(paragraph):
+            if hits["discussion_mode"]:
                 speech_is_discussion_mode = True
 
-            if in_line_amendment(paragraph):
+            if hits["in_line_amendment"]:
                 speech_is_discussion_mode = True
 
             if add_minor_heading_to_motion:
@@ -717,7 +757,7 @@ def get_motions(
                     current_motion += Flag.CLAUSE_MOTION
                     current_motion += Flag.COMPLEX_MOTION
 
-            if current_motion and motion_start_sequence(paragraph):
+            if current_motion and hits["motion_start_sequence"]:
                 # trigger word for new motion, need to finish the old one
                 if "that this house" in str(current_motion).lower():
                     current_motion = current_motion.finish(collection, "new motion")
@@ -725,11 +765,11 @@ def get_motions(
             # Here we're looking for ordinary phrases that herald the start of a motion
             # beg to move etc
             if current_motion is None and (
-                motion_start(paragraph) or malformed_motion_start(paragraph)
+                hits["motion_start"] or hits["malformed_motion_start"]
             ):
                 debug_test(paragraph, "motion start")
                 current_motion = new_motion(paragraph.pid or f"subitem/{index}")
-                if resolved_start(paragraph):
+                if hits["resolved_start"]:
                     # add the preceding text to the motion because it has useful clues usually
                     # if there are scottish motions in this
                     prev_sp_motions = extract_sp_motions(str(previous_item))
@@ -740,7 +780,7 @@ def get_motions(
                     current_motion += Flag.AFTER_DECISION
             if current_motion is None:
                 # similarly if there's the shortform amendment (and) the amendment close language in the same line
-                if in_line_amendment(paragraph) and signature_close(paragraph):
+                if hits["in_line_amendment"] and hits["signature_close"]:
                     current_motion = new_motion(paragraph.pid or f"subitem/{index}")
                     current_motion.add(
                         paragraph, new_final_id=transcript_group.speech.id
@@ -755,7 +795,7 @@ def get_motions(
                 # there's less preamble - but it's easier to make connections
                 if (
                     transcript_group.speech.person_id is None
-                    and motion_amendment_jump_in(paragraph)
+                    and hits["motion_amendment_jump_in"]
                 ):
                     current_motion = new_motion(paragraph.pid or f"subitem/{index}")
                     current_motion.add(
@@ -768,7 +808,7 @@ def get_motions(
             if speech_is_discussion_mode:
                 debug_test(paragraph, "speech is discussion")
                 # if start of new one
-                if in_line_amendment(paragraph):
+                if hits["in_line_amendment"]:
                     # assume end of one one if exists
                     if current_motion:
                         # store the one in progress if hitting a new one
@@ -778,7 +818,7 @@ def get_motions(
                     # start new one
                     current_motion = new_motion(paragraph.pid or f"subitem/{index}")
                     current_motion += Flag.INLINE_AMENDMENT
-                if amendment_explainer(paragraph):
+                if hits["amendment_explainer"]:
                     # if the amendment is being explained - we're done
                     # some case for including this - but for consistency because
                     # we don't always get it
@@ -792,7 +832,7 @@ def get_motions(
             if current_motion is not None:
                 debug_test(paragraph, "main processing")
 
-                if end_motion(paragraph):
+                if hits["end_motion"]:
                     current_motion = current_motion.finish(collection, "end motion")
                     continue
 
@@ -806,9 +846,9 @@ def get_motions(
 
                     # if we're seeing a one line motion - we're done
                     if (
-                        one_line_motion(paragraph)
-                        or disagree_with_lords_amendment(paragraph)
-                        or signature_close(paragraph)
+                        hits["one_line_motion"]
+                        or hits["disagree_with_lords_amendment"]
+                        or hits["signature_close"]
                     ):
                         debug_test(paragraph, "one line")
                         current_motion += Flag.ONE_LINE_MOTION
@@ -820,7 +860,7 @@ def get_motions(
                     # lines after the first line
 
                     # sometimes the question is effectively immediately asked
-                    if asked_immediately(paragraph):
+                    if hits["asked_immediately"]:
                         debug_test(paragraph, "asked immediately")
                         # stash this infomration for iteration later
                         current_motion += Flag.ASKED_IMMEDIATELY
@@ -842,27 +882,25 @@ def get_motions(
                     # if we're starting to see an itemised list - that means we're dealing with a more complex motion
                     # that's doing something to legislation or standing orders
                     # trigger advance processing modes
-                    if is_subitem(paragraph) or ends_in_continuation_character(
-                        paragraph
-                    ):
+                    if hits["is_subitem"] or hits["ends_in_continuation_character"]:
                         debug_test(paragraph, "complex motion")
                         current_motion += Flag.COMPLEX_MOTION
 
                     # end of amendments have a distinctive bit where it is
                     # closed with the name in brackets of the person who said it
-                    if signature_close(paragraph):
+                    if hits["signature_close"]:
                         current_motion = current_motion.finish(
                             collection, "amendment closed with name"
                         )
                         continue
 
-                    if is_subitem(next_item):
+                    if next_hits["is_subitem"]:
                         current_motion += Flag.COMPLEX_MOTION
 
                     if current_motion.has_flag(Flag.COMPLEX_MOTION) is False:
                         # Normally a hint we're done for simple motions
                         #  motions will finish on a full stop of closed quote
-                        if valid_ender_character(paragraph):
+                        if hits["valid_ender_character"]:
                             current_motion = current_motion.finish(
                                 collection, "Valid end character"
                             )
@@ -877,20 +915,20 @@ def get_motions(
                         debug_test(paragraph, "complex motion handling")
                         if (
                             next_item
-                            and not is_subitem(next_item)
-                            and not end_on_alphanumeric(next_item)
-                            and not is_inserted(next_item)
-                            and not ends_in_continuation_character(paragraph)
-                            and not signature_close(next_item)
+                            and not next_hits["is_subitem"]
+                            and not next_hits["end_on_alphanumeric"]
+                            and not next_hits["is_inserted"]
+                            and not hits["ends_in_continuation_character"]
+                            and not next_hits["signature_close"]
                             and next_item.tag not in ["table"]
-                        ) or (signature_close(paragraph)):
+                        ) or hits["signature_close"]:
                             debug_test(paragraph, "complex motion end")
                             current_motion = current_motion.finish(
                                 collection,
                                 "next is not subitem, ends in non alphanumeric, not inserted; current does not end  continuation character",
                             )
                         elif next_item is None:
-                            if ends_in_continuation_character(paragraph):
+                            if hits["ends_in_continuation_character"]:
                                 # ok, this is annoying one where part of a motion is being taken *as* the header
                                 # hence how we've got to the end of the speech, there's nothing left - and yet we continue.
                                 # so what we have to do here is add the next_minor_heading as part of the motion and let the process contine
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# small enough that a month or so of a chamber's rows can be read on its own
+row_group_size = 500
+
+Partition = tuple[str, int]
+
+
+def partition_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Chamber and year for each row.
+    Division links have no date column, so the year comes from the division gid.
+    """
+    if "date" in df.columns:
+        dates = df["date"].astype(str)
+    else:
+        dates = df[df.columns[0]].astype(str).str.extract(r"(\d{4}-\d{2}-\d{2})")[0]
+    return pd.DataFrame(
+        {"chamber": df["chamber"].astype(str), "year": dates.str[:4].astype(int)},
+        index=df.index,
+    )
+
+
+def affected_partitions(df: pd.DataFrame) -> set[Partition]:
+    keys = partition_keys(df).drop_duplicates()
+    return {(chamber, int(year)) for chamber, year in keys.itertuples(index=False)}
+
+
+def source_partition(source_file: str) -> Optional[Partition]:
+    """
+    Chamber and year of a yearly parquet from its name
+    (e.g. house-of-commons-2024-motions.parquet), if it has one
+    """
+    match = re.match(r"^(.+)-(\d{4})-[a-z-]+\.parquet$", source_file)
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def partition_path(output_dir: Path, chamber: str, year: int) -> Path:
+    return output_dir / f"chamber={chamber}" / f"year={year}"
+
+
+def write_partitioned(
+    df: pd.DataFrame,
+    output_dir: Path,
+    partitions: Optional[set[Partition]] = None,
+):
+    """
+    Write a dataset as hive style chamber=/year= partitions.
+    Rows are sorted by date and id so row group statistics can be used to skip
+    parts of a year.
+
+    If partitions is given, only those partitions are rewritten, otherwise
+    the whole dataset is replaced.
+    """
+    if partitions is None:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    keys = partition_keys(df)
+    sort_by = ["date", df.columns[0]] if "date" in df.columns else [df.columns[0]]
+
+    for (chamber, year), part_df in df.groupby([keys["chamber"], keys["year"]]):
+        if partitions is not None and (chamber, year) not in partitions:
+            continue
+        path = partition_path(output_dir, chamber, year)
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        part_df = part_df.drop(columns="chamber").sort_values(sort_by)
+        table = pa.Table.from_pandas(part_df, preserve_index=False)
+        pq.write_table(table, path / "part-0.parquet", row_group_size=row_group_size)
+
+    # partitions that no longer have any rows
+    if partitions is not None:
+        remaining = affected_partitions(df)
+        for chamber, year in partitions - remaining:
+            shutil.rmtree(partition_path(output_dir, chamber, year), ignore_errors=True)
@@ -2,29 +2,203 @@ from __future__ import annotations
 
 import datetime
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Optional
 
 import pandas as pd
-from mysoc_validator import Transcript
 from mysoc_validator.models.transcripts import Chamber
-from mysoc_validator.utils.parlparse.downloader import get_latest_for_date
 from pydantic import ValidationError
 from tqdm import tqdm
 
-from .mapper import MotionMapper, ResultsHolder
+from .detector import MemoStats, detector_memo
+from .downloader import clear_index_cache, share_rate_limit
+from .fixups import fixups_for_day, get_fixups, load_transcript
+from .interim import InterimFormat
+from .manifest import (
+    DayInputs,
+    ProcessingManifest,
+    get_manual_links_hash,
+    get_sp_motions_hash,
+)
+from .mapper import (
+    MotionMapper,
+    ResultsHolder,
+    get_manual_connections,
+    get_manual_text,
+    get_sp_manager,
+)
+from .motions import get_sp_manager as get_motions_sp_manager
+from .partitions import affected_partitions, source_partition, write_partitioned
+from .providers import TranscriptProvider, default_provider
+from .sitting_calendar import SittingCalendar
+from .timing import StageTimer, StageTiming, timings_path, write_timings
+from .transcript_store import TranscriptUnavailableError
 
 data_dir = Path(__file__).parent.parent.parent / "data"
 
 
+def warm_caches(data_dir: Path, chamber: Chamber = Chamber.COMMONS):
+    """
+    Load the shared lookups once per process rather than on the first day that needs them
+    """
+    get_manual_connections(data_dir)
+    get_manual_text(data_dir)
+    get_fixups(data_dir)
+    if chamber == Chamber.SCOTLAND:
+        get_sp_manager()
+        get_motions_sp_manager()
+        get_sp_motions_hash()
+
+
+def clear_input_caches():
+    """
+    Forget the lookups read from data_dir, so a run in a long-lived process
+    sees any edits made since the last one
+    """
+    get_manual_connections.cache_clear()
+    get_manual_text.cache_clear()
+    get_fixups.cache_clear()
+
+
+def init_worker(data_dir: Path, chamber: Chamber, workers: int):
+    """
+    Set up a worker process for render_year.
+    Workers split the download rate limit so together they stay within it.
+    """
+    share_rate_limit(workers)
+    warm_caches(data_dir, chamber)
+
+
+@dataclass
+class DayResult:
+    success: bool
+    # the inputs used for this day - None if there was nothing to record
+    inputs: Optional[DayInputs] = None
+    # False if there was no transcript for the day,
+    # None if the server couldn't be reached so we don't know
+    found: Optional[bool] = True
+    timings: list[StageTiming] = field(default_factory=list)
+    # use of the detector memo while rendering the day
+    memo: MemoStats = field(default_factory=MemoStats)
+
+
+def render_day(
+    data_dir: Path,
+    debate_date: str,
+    previous: Optional[DayInputs] = None,
+    chamber: Chamber = Chamber.COMMONS,
+    fail_day: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    refresh_since: Optional[str] = None,
+    provider: Optional[TranscriptProvider] = None,
+    manual_links: Optional[str] = None,
+) -> DayResult:
+    """
+    Render motions for a single date to the interim results folder.
+    If the inputs match `previous` and results already exist, the day is skipped.
+    Success is False if the day failed and fail_day is set (otherwise errors are raised).
+    Days on or after refresh_since are checked against the server for a newer version.
+    Transcripts come from provider (by default the store in data_dir/scrapedxml).
+    manual_links is the run's hash of the manual links file (worked out if not given).
+    """
+    provider = provider or default_provider(data_dir / "scrapedxml")
+    results_dir = data_dir / "interim" / "results"
+    timer = StageTimer(debate_date, str(chamber))
+    memo_start = replace(detector_memo.stats)
+
+    def result(**kwargs) -> DayResult:
+        return DayResult(
+            timings=timer.timings, memo=detector_memo.stats - memo_start, **kwargs
+        )
+
+    try:
+        with timer.stage("get_transcript"):
+            source = provider.latest(
+                datetime.date.fromisoformat(debate_date),
+                chamber,
+                refresh=refresh_since is not None and debate_date >= refresh_since,
+            )
+    except FileNotFoundError:
+        return result(success=True, found=False)
+    except TranscriptUnavailableError as e:
+        # keep what we had for the day, it'll be tried again next run
+        print(e)
+        return result(success=False, inputs=previous, found=None)
+
+    with timer.stage("check_inputs"):
+        fixups = fixups_for_day(data_dir, chamber, debate_date)
+        inputs = DayInputs.from_transcript(
+            source, data_dir, fixups, chamber, manual_links
+        )
+        unchanged = (
+            inputs == previous
+            and ResultsHolder.data_dir_path(
+                results_dir, debate_date, chamber, interim_format
+            ).exists()
+        )
+    if unchanged:
+        return result(success=True, inputs=inputs)
+
+    try:
+        with timer.stage("parse") as stage:
+            transcript = load_transcript(source, fixups)
+            stage.items = len(transcript.items)
+    except ValidationError:
+        print(f"Validation error for date: {debate_date}")
+        return result(success=True)
+
+    mm = MotionMapper(
+        transcript,
+        debate_date=debate_date,
+        data_dir=data_dir,
+        chamber=chamber,
+        timer=timer,
+    )
+
+    try:
+        with timer.stage("assign") as stage:
+            mm.assign()
+            stage.items = len(mm.division_assignments) + len(mm.agreement_assignments)
+    except Exception as e:
+        if fail_day:
+            # just print the content of the error
+            print(e)
+            return result(success=False)
+        raise e
+    with timer.stage("write"):
+        results = mm.export()
+        results.to_data_dir(results_dir, interim_format)
+    return result(success=True, inputs=inputs)
+
+
 def render_year(
     data_dir: Path,
     year: int | None = None,
     dates_in_year: list[datetime.date] | None = None,
     chamber: Chamber = Chamber.COMMONS,
     fail_day: bool = False,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+    refresh_days: int = 0,
+    provider: Optional[TranscriptProvider] = None,
 ):
     """
     Render motions for a specify year
+    Days whose inputs are unchanged since the last run are reused unless force is set.
+    Days the sitting calendar knows the chamber didn't sit are skipped unless force
+    is set, or a transcript for them has since turned up in the local store.
+    If timings is set, the time spent in each stage of each day is written
+    to data/processed/timings as JSON lines.
+    If prefetch is set, missing transcripts are downloaded that many at a time
+    while earlier days are being processed.
+    Days within refresh_days of today are revalidated against the server,
+    so corrected or newer versions of recent transcripts are picked up.
     """
     current_date = datetime.datetime.now().date()
     if year is None:
@@ -40,78 +214,158 @@ def render_year(
     # all dates in year to date
     str_dates_in_year = [x.isoformat() for x in dates_in_year if x <= current_date]
 
-    xml_path = data_dir / "scrapedxml" / chamber
-
-    xml_path.mkdir(parents=True, exist_ok=True)
-
-    fails_on = []
-
-    for debate_date in tqdm(str_dates_in_year, desc=label):
-        try:
-            transcript_path = get_latest_for_date(
-                datetime.date.fromisoformat(debate_date),
-                download_path=xml_path,
-                chamber=chamber,
-            )
-        except FileNotFoundError:
-            continue
-        # fix 2019 error
-        txt = transcript_path.read_text()
-
-        if "21&#10;14" in txt:
-            txt = txt.replace("21&#10;14", "2114")
-            transcript_path.write_text(txt)
-
-        if "S6M-133651.1" in txt:
-            txt = txt.replace("S6M-133651.1", "S6M-13365.1")
-            transcript_path.write_text(txt)
-
-        if "S6M-013368" in txt:
-            txt = txt.replace("S6M-013368", "S6M-13368")
-            transcript_path.write_text(txt)
-
-        try:
-            transcript = Transcript.from_xml_path(transcript_path)
-        except ValidationError:
-            print(f"Validation error for date: {debate_date}")
-            continue
+    provider = provider or default_provider(data_dir / "scrapedxml")
+    # a long-running process would otherwise never see newly published days
+    # or edits to the inputs in data_dir
+    clear_index_cache()
+    clear_input_caches()
+    manual_links = get_manual_links_hash(data_dir)
+
+    manifest = ProcessingManifest.from_data_dir(data_dir, chamber)
+    calendar = SittingCalendar.from_data_dir(data_dir, chamber)
+    calendar.refresh(provider.local_dates(chamber), list(manifest.days))
+    if not force:
+        str_dates_in_year = calendar.candidate_days(str_dates_in_year)
+
+    previous_inputs = {
+        x: None if force else manifest.days.get(x) for x in str_dates_in_year
+    }
+
+    render = partial(
+        render_day,
+        data_dir,
+        chamber=chamber,
+        fail_day=fail_day,
+        interim_format=interim_format,
+        refresh_since=(
+            (current_date - datetime.timedelta(days=refresh_days)).isoformat()
+            if refresh_days
+            else None
+        ),
+        provider=provider,
+        manual_links=manual_links,
+    )
 
-        mm = MotionMapper(
-            transcript, debate_date=debate_date, data_dir=data_dir, chamber=chamber
+    render_order: Iterable[str] = str_dates_in_year
+    if prefetch:
+        # download missing transcripts in the background and render each day
+        # as its transcript lands
+        landed = provider.iter_prefetch(
+            [datetime.date.fromisoformat(x) for x in str_dates_in_year],
+            chamber,
+            concurrency=prefetch,
         )
+        render_order = (date.isoformat() for date in landed)
+
+    results_by_date: dict[str, DayResult] = {}
+    if workers > 1:
+        if prefetch:
+            # finish downloading before forking workers, as forking while the
+            # download threads are running isn't safe
+            render_order = list(render_order)
+        # warm here first so any one-off downloads happen once, not in every worker
+        warm_caches(data_dir, chamber)
+        # each day is independent, so fan them out
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(data_dir, chamber, workers),
+        ) as executor:
+            futures = {
+                executor.submit(render, x, previous_inputs[x]): x for x in render_order
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc=label):
+                results_by_date[futures[future]] = future.result()
+    else:
+        for debate_date in tqdm(render_order, total=len(str_dates_in_year), desc=label):
+            results_by_date[debate_date] = render(
+                debate_date, previous_inputs[debate_date]
+            )
+    day_results = [results_by_date[x] for x in str_dates_in_year]
 
-        try:
-            mm.assign()
-        except Exception as e:
-            if fail_day:
-                fails_on.append(debate_date)
-                # just print the content of the error
-                print(e)
-                continue
-            raise e
-        results = mm.export()
-        results.to_data_dir(data_dir / "interim" / "results")
+    fails_on = []
+    unreachable = []
+    for debate_date, result in zip(str_dates_in_year, day_results):
+        if result.found is None:
+            unreachable.append(debate_date)
+        elif not result.success:
+            fails_on.append(debate_date)
+        if result.inputs:
+            manifest.days[debate_date] = result.inputs
+        else:
+            manifest.days.pop(debate_date, None)
+        if result.found:
+            calendar.mark_sitting({debate_date})
+        elif result.found is False:
+            calendar.mark_missing(debate_date, current_date)
+    manifest.to_data_dir(data_dir)
+    calendar.to_data_dir(data_dir)
 
     if fail_day:
         day_fails = len(fails_on)
         if day_fails > 0:
             print(f"Fails on {day_fails} days")
             print(fails_on)
+    if unreachable:
+        print(f"Could not download {len(unreachable)} days, rerun to try again")
+        print(unreachable)
+
+    year_timer = StageTimer(label, str(chamber))
+    with year_timer.stage("export_composite"):
+        ResultsHolder.export_composite(
+            data_dir / "interim" / "results",
+            data_dir / "processed" / "parquet",
+            date=label,
+            chamber=chamber,
+        )
 
-    rh = ResultsHolder.from_data_dir_composite(
-        data_dir / "interim" / "results", date=label, chamber=chamber
-    )
-    rh.export(data_dir / "processed" / "parquet")
+    if timings:
+        memo = sum((x.memo for x in day_results), MemoStats())
+        print(f"Detector memo: {memo}")
+        day_timings = [x for result in day_results for x in result.timings]
+        write_timings(
+            timings_path(data_dir, chamber, label),
+            day_timings + year_timer.timings,
+        )
 
 
-def render_policy_days(data_dir: Path, chamber: Chamber = Chamber.COMMONS):
+def render_policy_days(
+    data_dir: Path,
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+    provider: Optional[TranscriptProvider] = None,
+):
     data = json.loads(Path("data", "raw", "pre_2019_dates.json").read_text())
     dates = [datetime.date.fromisoformat(x) for x in data]
     dates.sort()
-    render_year(data_dir, dates_in_year=dates, chamber=chamber, fail_day=True)
+    render_year(
+        data_dir,
+        dates_in_year=dates,
+        chamber=chamber,
+        fail_day=True,
+        workers=workers,
+        force=force,
+        interim_format=interim_format,
+        timings=timings,
+        prefetch=prefetch,
+        provider=provider,
+    )
 
 
-def render_historical(data_dir: Path, chamber: Chamber = Chamber.COMMONS):
+def render_historical(
+    data_dir: Path,
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+    provider: Optional[TranscriptProvider] = None,
+):
     """
     Render motions for all historical dates
     """
@@ -123,14 +377,44 @@ def render_historical(data_dir: Path, chamber: Chamber = Chamber.COMMONS):
         raise ValueError("Chamber not supported")
     current_year = datetime.datetime.now().year
     for year in range(start_year, current_year):
-        render_year(data_dir, year=year, chamber=chamber)
+        render_year(
+            data_dir,
+            year=year,
+            chamber=chamber,
+            workers=workers,
+            force=force,
+            interim_format=interim_format,
+            timings=timings,
+            prefetch=prefetch,
+            provider=provider,
+        )
 
 
-def render_latest(data_dir: Path, chamber: Chamber = Chamber.COMMONS):
+def render_latest(
+    data_dir: Path,
+    chamber: Chamber = Chamber.COMMONS,
+    workers: int = 1,
+    force: bool = False,
+    interim_format: InterimFormat = InterimFormat.ARROW,
+    timings: bool = False,
+    prefetch: int = 0,
+    refresh_days: int = 0,
+    provider: Optional[TranscriptProvider] = None,
+):
     """
     Render motions for the latest date
     """
-    render_year(data_dir, chamber=chamber)
+    render_year(
+        data_dir,
+        chamber=chamber,
+        workers=workers,
+        force=force,
+        interim_format=interim_format,
+        timings=timings,
+        prefetch=prefetch,
+        refresh_days=refresh_days,
+        provider=provider,
+    )
 
 
 def delete_current_year_parquets(data_dir: Path):
@@ -141,60 +425,163 @@ def delete_current_year_parquets(data_dir: Path):
         file.unlink()
 
 
-def move_to_package(data_dir: Path = data_dir):
+package_file_endings = [
+    "agreements.parquet",
+    "motions.parquet",
+    "division-links.parquet",
+]
+
+
+def read_yearly_parquets(files: list[Path]) -> list[pd.DataFrame]:
+    """
+    Read each yearly parquet once, tagging rows with the file they came from.
+    Files with a single row or less are skipped.
+    """
+    dfs = []
+    for file in files:
+        df = pd.read_parquet(file)
+        if len(df) > 1:
+            dfs.append(df.assign(source_file=file.name))
+    return dfs
+
+
+def merge_package_rows(df: pd.DataFrame, file_ending: str) -> pd.DataFrame:
+    """
+    Combine the yearly rows into a single table with one row per id (first column)
+    """
+    key = df.columns[0]
+
+    # sort by first column
+    df = df.sort_values(by=key)
+
+    # remove duplicate rows
+    df = df.drop_duplicates()
+
+    # ok, so a reason a duplicate might survive that is where one variant has picked up
+    # the 'good' motion_title for scotland and the other is stuck on 'Decision Time'
+    # so for any id with more than one title, drop the 'Decision Time' rows
+    if "motion_title" in df.columns:
+        title_count = df.groupby(key)["motion_title"].transform("nunique", dropna=False)
+        df = df[~((df["motion_title"] == "Decision Time") & (title_count > 1))]
+
+    # check there are no remaining duplicated values in the first column
+    duplicated = df[key].duplicated()
+    if duplicated.any():
+        duplicate_vals = df[key][duplicated].tolist()
+        raise ValueError(
+            f"Duplicated values in the first column for {file_ending}: {duplicate_vals}"
+        )
+
+    return df
+
+
+def changed_sources(
+    previous: dict[str, list[int]], current: dict[str, list[int]]
+) -> list[str]:
+    """
+    Source files added, changed or removed since previous
+    """
+    return sorted(
+        x for x in previous.keys() | current.keys() if previous.get(x) != current.get(x)
+    )
+
+
+def sources_for(state: dict[str, list[int]], file_ending: str) -> dict[str, list[int]]:
+    return {k: v for k, v in state.items() if k.endswith(f"-{file_ending}")}
+
+
+def load_source_state(path: Path) -> dict[str, list[int]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def move_to_package(
+    data_dir: Path = data_dir, changed_only: bool = False, partitioned: bool = False
+):
     """
     Move all processed data to the package
+
+    With changed_only, rows from yearly parquets that have not changed since the
+    last run are taken from a local cache rather than being read again.
+    If nothing has changed, the package files are left alone.
+
+    With partitioned, each dataset is also written to data/processed/partitioned
+    split by chamber and year. With changed_only, only the partitions touched
+    by yearly parquets that have changed since the partitions were last
+    written are rewritten. This is tracked separately from the package, as
+    runs without partitioned don't update the partitions.
     """
     package_dir = data_dir / "packages" / "parliamentary_motions"
     parquet_dir = data_dir / "processed" / "parquet"
-
-    file_endings = ["agreements.parquet", "motions.parquet", "division-links.parquet"]
-
-    for file_ending in file_endings:
-        dfs = []
-        for file in parquet_dir.glob(f"*-{file_ending}"):
-            df = pd.read_parquet(file)
-            if len(df) > 1:
-                dfs.append(pd.read_parquet(file))
-
-        df = pd.concat(dfs)
-
-        # sort by first column
-        df = df.sort_values(by=df.columns[0])
-
-        # remove duplicate rows
-        df = df.drop_duplicates()
-
-        # ok, so a reason a duplicate might survive that is where one variant has picked up
-        # the 'good' motion_title for scotland and the other is stuck on 'Decision Time'
-        # so to deal with this, we want look at all duplicated, check there is at least
-        # one non 'Decision Time' and then drop the rest
-        # the first col is usually gid not motion_title
-        indexes_to_drop = []
-        if "motion_title" in df.columns:
-            for gid, group_df in df.groupby(df.columns[0]):
-                if len(group_df) > 1:
-                    unique_titles = group_df["motion_title"].unique()
-                    if len(unique_titles) > 1:
-                        # check if there is a non 'Decision Time' title
-                        if "Decision Time" in unique_titles:
-                            # drop the 'Decision Time' title
-                            indexes_to_drop.extend(
-                                group_df[
-                                    group_df["motion_title"] == "Decision Time"
-                                ].index.tolist()
-                            )
-
-        # drop these indexes
-        df = df.drop(indexes_to_drop)
-
-        # check there are no remaining duplicated values in the first column
-
-        if df[df.columns[0]].duplicated().sum() != 0:
-            dulicate_vals = df[df.columns[0]][df[df.columns[0]].duplicated()].tolist()
-
-            raise ValueError(
-                f"Duplicated values in the first column for {file_ending}: {dulicate_vals}"
+    partitioned_dir = data_dir / "processed" / "partitioned"
+    cache_dir = data_dir / "interim" / "package_cache"
+    state_path = cache_dir / "sources.json"
+    partitioned_state_path = cache_dir / "partitioned_sources.json"
+
+    previous_state: dict[str, list[int]] = {}
+    previous_partitioned_state: dict[str, list[int]] = {}
+    if changed_only:
+        previous_state = load_source_state(state_path)
+        previous_partitioned_state = load_source_state(partitioned_state_path)
+
+    state: dict[str, list[int]] = {}
+
+    for file_ending in package_file_endings:
+        files = sorted(parquet_dir.glob(f"*-{file_ending}"))
+        file_state = {}
+        for file in files:
+            stat = file.stat()
+            file_state[file.name] = [stat.st_mtime_ns, stat.st_size]
+        state.update(file_state)
+
+        cache_path = cache_dir / file_ending
+        package_path = package_dir / file_ending
+        dataset_dir = partitioned_dir / file_ending.removesuffix(".parquet")
+
+        changed = changed_sources(sources_for(previous_state, file_ending), file_state)
+        cached = changed_only and cache_path.exists() and package_path.exists()
+        if cached and not changed:
+            df = None
+        else:
+            if cached:
+                cached_rows = pd.read_parquet(cache_path)
+                stale = cached_rows["source_file"].isin(changed)
+                new_rows = read_yearly_parquets([f for f in files if f.name in changed])
+                rows = pd.concat([cached_rows[~stale], *new_rows])
+            else:
+                rows = pd.concat(read_yearly_parquets(files))
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            rows.to_parquet(cache_path)
+            df = merge_package_rows(rows.drop(columns="source_file"), file_ending)
+            df.to_parquet(package_path)
+
+        if not partitioned:
+            continue
+        partitions = None
+        if changed_only and dataset_dir.exists():
+            partition_changes = changed_sources(
+                sources_for(previous_partitioned_state, file_ending), file_state
             )
-
-        df.to_parquet(package_dir / file_ending)
+            if not partition_changes:
+                continue
+            # where the changed files' rows are now, and where they were before
+            rows = pd.read_parquet(cache_path)
+            partitions = affected_partitions(
+                rows[rows["source_file"].isin(partition_changes)]
+            )
+            for source_file in partition_changes:
+                partition = source_partition(source_file)
+                if partition is None:
+                    # can't tell where its old rows were, so rewrite everything
+                    partitions = None
+                    break
+                partitions.add(partition)
+        if df is None:
+            df = pd.read_parquet(package_path)
+        write_partitioned(df, dataset_dir, partitions)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps(state, indent=2))
+    if partitioned:
+        partitioned_state_path.write_text(json.dumps(state, indent=2))
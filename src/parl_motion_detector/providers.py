@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import datetime
+import gzip
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Optional
+
+from mysoc_validator import Transcript
+from mysoc_validator.models.transcripts import Chamber
+
+from .bundles import bundle_paths, open_bundle
+from .downloader import (
+    TranscriptType,
+    TranscriptXMl,
+    XMLManager,
+    get_latest_for_date,
+    iter_prefetch,
+    local_dates,
+)
+from .local_index import get_index, parse_transcript_name
+from .sitting_calendar import grace_days
+from .transcript_store import (
+    TranscriptUnavailableError,
+    compressed_suffix,
+    decode_transcript,
+    logical_path,
+    read_transcript_bytes,
+)
+
+# set to only use transcripts that are already stored (e.g. in CI)
+OFFLINE: bool = os.environ.get("PARL_MOTION_DETECTOR_OFFLINE", "") == "1"
+
+default_store_root = Path(__file__).parent.parent.parent / "data" / "scrapedxml"
+
+
+def bundle_root(store_root: Path) -> Path:
+    """
+    Where year bundles packed from a store go
+    """
+    return store_root.parent / "bundles"
+
+
+def get_manager(chamber: Chamber) -> XMLManager:
+    return TranscriptXMl.get_transcript_manager(chamber, TranscriptType.DEBATES)
+
+
+class TranscriptSource(ABC):
+    """
+    A single stored transcript, wherever it lives
+    """
+
+    # plain file name, e.g. debates2024-01-01a.xml
+    name: str
+
+    @abstractmethod
+    def read_bytes(self) -> bytes: ...
+
+    def read_text(self) -> str:
+        return decode_transcript(self.read_bytes())
+
+    def read(self) -> Transcript:
+        return Transcript.model_validate_xml(self.read_text())
+
+    def sha256(self) -> str:
+        """
+        Hash of the uncompressed content
+        """
+        return hashlib.sha256(self.read_bytes()).hexdigest()
+
+
+@dataclass(frozen=True)
+class FileSource(TranscriptSource):
+    path: Path
+    # download path the file is indexed under, if any
+    root: Optional[Path] = None
+
+    @property
+    def name(self) -> str:
+        return logical_path(self.path).name
+
+    def read_bytes(self) -> bytes:
+        return read_transcript_bytes(self.path)
+
+    def sha256(self) -> str:
+        if self.root is None:
+            return super().sha256()
+        return get_index(self.root).file_hash(self.path)
+
+
+@dataclass(frozen=True)
+class MemorySource(TranscriptSource):
+    name: str
+    data: bytes
+
+    def read_bytes(self) -> bytes:
+        return self.data
+
+
+@dataclass(frozen=True)
+class ArchiveSource(TranscriptSource):
+    archive: Path
+    member: str
+
+    @property
+    def name(self) -> str:
+        return logical_path(Path(self.member)).name
+
+    def read_bytes(self) -> bytes:
+        data = open_bundle(self.archive).read(self.member)
+        if self.member.endswith(compressed_suffix):
+            return gzip.decompress(data)
+        return data
+
+
+class TranscriptProvider(ABC):
+    """
+    Somewhere to get transcripts from.
+    latest raises FileNotFoundError if there is no transcript for a day, and
+    TranscriptUnavailableError if there may be one but it can't be got.
+    """
+
+    @abstractmethod
+    def latest(
+        self,
+        date: datetime.date,
+        chamber: Chamber = Chamber.COMMONS,
+        *,
+        refresh: bool = False,
+    ) -> TranscriptSource: ...
+
+    def local_dates(
+        self, chamber: Chamber = Chamber.COMMONS, year: Optional[int] = None
+    ) -> list[str]:
+        """
+        Dates available without a download
+        """
+        return []
+
+    def iter_prefetch(
+        self,
+        dates: list[datetime.date],
+        chamber: Chamber = Chamber.COMMONS,
+        concurrency: int = 8,
+    ) -> Iterator[datetime.date]:
+        """
+        Dates in the order their transcripts become available.
+        Providers with nothing to fetch just return them as they are.
+        """
+        yield from dates
+
+
+@dataclass
+class LocalStoreProvider(TranscriptProvider):
+    """
+    Transcripts already in the local store - never touches the network.
+    A day without one is only reported missing if the server said it had
+    none when checked at least grace_days after it; otherwise it may just
+    not have been downloaded.
+    """
+
+    root: Path = default_store_root
+
+    def store_path(self, chamber: Chamber) -> Path:
+        return self.root / str(chamber)
+
+    def latest(
+        self,
+        date: datetime.date,
+        chamber: Chamber = Chamber.COMMONS,
+        *,
+        refresh: bool = False,
+    ) -> TranscriptSource:
+        store_path = self.store_path(chamber)
+        manager = get_manager(chamber)
+        versions = manager.local_versions(date, store_path)
+        if not versions:
+            checked = manager.missing_checked(date, store_path)
+            if checked and checked - date > datetime.timedelta(days=grace_days):
+                raise FileNotFoundError(f"No transcript for {date} (checked {checked})")
+            raise TranscriptUnavailableError(f"No stored transcript for {date}")
+        return FileSource(versions[-1], store_path)
+
+    def local_dates(
+        self, chamber: Chamber = Chamber.COMMONS, year: Optional[int] = None
+    ) -> list[str]:
+        return local_dates(
+            year, chamber=chamber, download_path=self.store_path(chamber)
+        )
+
+
+@dataclass
+class HTTPProvider(LocalStoreProvider):
+    """
+    The local store, downloading anything missing from theyworkforyou
+    """
+
+    def latest(
+        self,
+        date: datetime.date,
+        chamber: Chamber = Chamber.COMMONS,
+        *,
+        refresh: bool = False,
+    ) -> TranscriptSource:
+        store_path = self.store_path(chamber)
+        path = get_latest_for_date(
+            date, chamber=chamber, download_path=store_path, refresh=refresh
+        )
+        return FileSource(path, store_path)
+
+    def iter_prefetch(
+        self,
+        dates: list[datetime.date],
+        chamber: Chamber = Chamber.COMMONS,
+        concurrency: int = 8,
+    ) -> Iterator[datetime.date]:
+        landed = iter_prefetch(
+            dates,
+            chamber=chamber,
+            download_path=self.store_path(chamber),
+            concurrency=concurrency,
+        )
+        for date, _ in landed:
+            yield date
+
+
+@dataclass
+class ArchiveProvider(TranscriptProvider):
+    """
+    Transcripts read straight out of year bundles (root/<chamber>/<year>.zip
+    or .tar) laid out as in the local store, without extracting them.
+    Bundles aren't refreshed, so refresh requests are left to the next provider.
+    """
+
+    root: Path
+
+    def members(
+        self, chamber: Chamber, year: Optional[int] = None, date: Optional[str] = None
+    ) -> list[tuple[Path, str]]:
+        """
+        (bundle, member) for each of the chamber's transcripts, optionally
+        for just one year or date
+        """
+        manager = get_manager(chamber)
+        directory = PurePosixPath(manager.store_directory())
+        found = []
+        for archive in bundle_paths(self.root / str(chamber), year):
+            by_date = open_bundle(archive).by_date
+            for members in (
+                by_date.values() if date is None else [by_date.get(date, [])]
+            ):
+                found.extend(
+                    (archive, member)
+                    for member in members
+                    if PurePosixPath(member).parent == directory
+                    and manager.matches_name(PurePosixPath(member).name)
+                )
+        return found
+
+    def latest(
+        self,
+        date: datetime.date,
+        chamber: Chamber = Chamber.COMMONS,
+        *,
+        refresh: bool = False,
+    ) -> TranscriptSource:
+        if refresh:
+            raise FileNotFoundError(f"Bundled transcripts for {date} aren't refreshed")
+        versions = sorted(
+            (logical_path(Path(member)).name, archive, member)
+            for archive, member in self.members(chamber, date.year, date.isoformat())
+        )
+        if not versions:
+            raise FileNotFoundError(f"No archived transcript for {date}")
+        _, archive, member = versions[-1]
+        return ArchiveSource(archive, member)
+
+    def local_dates(
+        self, chamber: Chamber = Chamber.COMMONS, year: Optional[int] = None
+    ) -> list[str]:
+        return sorted(
+            {
+                date
+                for archive in bundle_paths(self.root / str(chamber), year)
+                for date in open_bundle(archive).by_date
+                if self.members(chamber, int(date[:4]), date)
+            }
+        )
+
+
+@dataclass
+class MemoryProvider(TranscriptProvider):
+    """
+    Transcripts held in memory by chamber and file name (for tests)
+    """
+
+    transcripts: dict[Chamber, dict[str, bytes]] = field(default_factory=dict)
+
+    def add(self, name: str, data: bytes, chamber: Chamber = Chamber.COMMONS):
+        self.transcripts.setdefault(chamber, {})[name] = data
+
+    def latest(
+        self,
+        date: datetime.date,
+        chamber: Chamber = Chamber.COMMONS,
+        *,
+        refresh: bool = False,
+    ) -> TranscriptSource:
+        manager = get_manager(chamber)
+        names = sorted(
+            name
+            for name in self.transcripts.get(chamber, {})
+            if manager.matches_name(name, date.isoformat())
+        )
+        if not names:
+            raise FileNotFoundError(f"No transcript held for {date}")
+        return MemorySource(names[-1], self.transcripts[chamber][names[-1]])
+
+    def local_dates(
+        self, chamber: Chamber = Chamber.COMMONS, year: Optional[int] = None
+    ) -> list[str]:
+        dates = set()
+        for name in self.transcripts.get(chamber, {}):
+            parts = parse_transcript_name(name)
+            if parts and (year is None or parts[1].startswith(str(year))):
+                dates.add(parts[1])
+        return sorted(dates)
+
+
+@dataclass
+class ChainProvider(TranscriptProvider):
+    """
+    Try each provider in turn, e.g. an archive and then the network.
+    Where several already hold a day the newest version wins, wherever it is.
+    A day is only missing if every provider says so.
+    """
+
+    providers: list[TranscriptProvider]
+
+    def latest(
+        self,
+        date: datetime.date,
+        chamber: Chamber = Chamber.COMMONS,
+        *,
+        refresh: bool = False,
+    ) -> TranscriptSource:
+        if not refresh:
+            held = [
+                provider.latest(date, chamber)
+                for provider in self.providers
+                if date.isoformat() in provider.local_dates(chamber, date.year)
+            ]
+            if held:
+                # letter versions sort by name, ties go to the earlier provider
+                return max(held, key=lambda x: x.name)
+        unavailable: Optional[TranscriptUnavailableError] = None
+        for provider in self.providers:
+            try:
+                return provider.latest(date, chamber, refresh=refresh)
+            except FileNotFoundError:
+                continue
+            except TranscriptUnavailableError as e:
+                unavailable = e
+        if unavailable is not None:
+            raise unavailable
+        raise FileNotFoundError(f"No files found for {date}")
+
+    def local_dates(
+        self, chamber: Chamber = Chamber.COMMONS, year: Optional[int] = None
+    ) -> list[str]:
+        dates = set()
+        for provider in self.providers:
+            dates.update(provider.local_dates(chamber, year))
+        return sorted(dates)
+
+    def iter_prefetch(
+        self,
+        dates: list[datetime.date],
+        chamber: Chamber = Chamber.COMMONS,
+        concurrency: int = 8,
+    ) -> Iterator[datetime.date]:
+        # days the earlier providers have are ready now, the last fetches the rest
+        held = set()
+        for provider in self.providers[:-1]:
+            held.update(provider.local_dates(chamber))
+        yield from (x for x in dates if x.isoformat() in held)
+        yield from self.providers[-1].iter_prefetch(
+            [x for x in dates if x.isoformat() not in held], chamber, concurrency
+        )
+
+
+def default_provider(store_root: Path = default_store_root) -> TranscriptProvider:
+    """
+    The local store, filled from theyworkforyou unless OFFLINE is set.
+    Any year bundles packed from the store are read too, with days in both
+    read from whichever has the newer version.
+    """
+    store: TranscriptProvider = (
+        LocalStoreProvider(store_root) if OFFLINE else HTTPProvider(store_root)
+    )
+    bundles = bundle_root(store_root)
+    if bundles.exists():
+        return ChainProvider([ArchiveProvider(bundles), store])
+    return store
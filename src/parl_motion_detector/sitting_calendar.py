@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import datetime
+import json
+from pathlib import Path
+
+from mysoc_validator.models.transcripts import Chamber
+from pydantic import BaseModel, Field
+
+# transcripts can be published a few days after a sitting
+# so a missing day is only treated as non-sitting once it is this old
+grace_days = 14
+
+
+class SittingCalendar(BaseModel):
+    """
+    Record of which days a chamber has or hasn't sat.
+    Days confirmed as non-sitting are skipped without looking for a transcript.
+    """
+
+    chamber: Chamber
+    sitting: set[str] = Field(default_factory=set)
+    not_sitting: set[str] = Field(default_factory=set)
+
+    @staticmethod
+    def calendar_path(data_dir: Path, chamber: Chamber) -> Path:
+        return data_dir / "interim" / f"{chamber}-calendar.json"
+
+    @classmethod
+    def from_data_dir(cls, data_dir: Path, chamber: Chamber) -> SittingCalendar:
+        path = cls.calendar_path(data_dir, chamber)
+        if not path.exists():
+            return cls(chamber=chamber)
+        return cls.model_validate_json(path.read_text())
+
+    def to_data_dir(self, data_dir: Path):
+        path = self.calendar_path(data_dir, self.chamber)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "chamber": str(self.chamber),
+            "sitting": sorted(self.sitting),
+            "not_sitting": sorted(self.not_sitting),
+        }
+        path.write_text(json.dumps(data, indent=2))
+
+    def refresh(self, local_days: list[str], processed_days: list[str]):
+        """
+        Add days with a local transcript or previously processed results.
+        This also clears late transcripts from not_sitting so they are rechecked.
+        """
+        self.mark_sitting(set(local_days) | set(processed_days))
+
+    def mark_sitting(self, days: set[str]):
+        self.sitting |= days
+        self.not_sitting -= days
+
+    def mark_missing(self, day: str, today: datetime.date):
+        """
+        Record a day with no transcript - only once the grace period has passed.
+        """
+        cutoff = today - datetime.timedelta(days=grace_days)
+        if datetime.date.fromisoformat(day) < cutoff and day not in self.sitting:
+            self.not_sitting.add(day)
+
+    def candidate_days(self, days: list[str]) -> list[str]:
+        """
+        Days that might have a transcript (known sitting days and unchecked days)
+        """
+        return [x for x in days if x not in self.not_sitting]
@@ -6,9 +6,9 @@ from pathlib import Path
 from mysoc_validator import Transcript
 from mysoc_validator.models.transcripts import Chamber
 
-from .downloader import get_latest_for_date
 from .mapper import MotionMapper
 from .motions import get_motions
+from .providers import default_provider
 
 debates_path = Path("data")
 tests_path = Path("data", "tests")
@@ -27,19 +27,15 @@ anchor_dates = [
 
 def generate_motion_snapshot(date: str):
     chamber = Chamber.COMMONS
-    transcript_path = get_latest_for_date(
-        datetime.date.fromisoformat(date), download_path=debates_path
-    )
-    transcript = Transcript.from_xml_path(transcript_path)
+    provider = default_provider(debates_path / "scrapedxml")
+    transcript = provider.latest(datetime.date.fromisoformat(date), chamber).read()
     found_motions = get_motions(chamber, transcript, date)
     found_motions.dump_test_data(tests_path / "motions")
 
 
 def generate_mapper_snapshot(date: str):
-    transcript_path = get_latest_for_date(
-        datetime.date.fromisoformat(date), download_path=debates_path
-    )
-    transcript = Transcript.from_xml_path(transcript_path)
+    provider = default_provider(debates_path / "scrapedxml")
+    transcript = provider.latest(datetime.date.fromisoformat(date)).read()
     mapper = MotionMapper(transcript, date, Transcript.Chamber.COMMONS, debates_path)
     mapper.assign()
     mapper.dump_test_data(tests_path / "mapper")
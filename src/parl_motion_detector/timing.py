@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+@dataclass
+class StageTiming:
+    date: str
+    chamber: str
+    stage: str
+    seconds: float = 0.0
+    # number of things the stage produced (motions found, files written, etc)
+    items: Optional[int] = None
+
+
+@dataclass
+class StageTimer:
+    """
+    Collects wall time and item counts for each stage of processing a day.
+    Set items on the yielded timing inside the block to record a count.
+    """
+
+    date: str
+    chamber: str
+    timings: list[StageTiming] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageTiming]:
+        timing = StageTiming(date=self.date, chamber=self.chamber, stage=name)
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            timing.seconds = time.perf_counter() - start
+            self.timings.append(timing)
+
+
+def timings_path(data_dir: Path, chamber: str, label: str) -> Path:
+    return data_dir / "processed" / "timings" / f"{chamber}-{label}.jsonl"
+
+
+def write_timings(path: Path, timings: list[StageTiming]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as f:
+        for timing in timings:
+            f.write(json.dumps(asdict(timing)) + "\n")
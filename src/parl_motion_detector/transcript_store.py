@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import gzip
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+from mysoc_validator import Transcript
+
+# write newly downloaded transcripts gzipped
+# existing plain .xml files are still read, so mirrors can be migrated at any time
+COMPRESS_TRANSCRIPTS: bool = True
+
+compressed_suffix = ".gz"
+
+# transcripts are written once and read many times, so favour size over speed
+compress_level = 9
+
+encoding_pattern = re.compile(rb"""encoding=["']([A-Za-z0-9._-]+)["']""")
+
+
+class TranscriptUnavailableError(Exception):
+    """
+    A transcript can't be got right now (offline, or the server isn't answering).
+    Unlike FileNotFoundError this says nothing about whether it exists.
+    """
+
+
+def is_compressed(path: Path) -> bool:
+    return path.name.endswith(compressed_suffix)
+
+
+def logical_path(path: Path) -> Path:
+    """
+    The plain .xml path a stored transcript stands for
+    """
+    if is_compressed(path):
+        return path.with_name(path.name[: -len(compressed_suffix)])
+    return path
+
+
+def compressed_path(path: Path) -> Path:
+    path = logical_path(path)
+    return path.with_name(path.name + compressed_suffix)
+
+
+def stored_path(path: Path) -> Optional[Path]:
+    """
+    Where the transcript for a plain .xml path is actually stored, if anywhere
+    """
+    for candidate in (compressed_path(path), logical_path(path)):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def transcript_glob(pattern: str) -> list[str]:
+    """
+    Glob patterns matching a .xml pattern in either form
+    """
+    return [pattern, pattern + compressed_suffix]
+
+
+def open_transcript(path: Path) -> IO[bytes]:
+    """
+    Binary file of a stored transcript's uncompressed content
+    """
+    if is_compressed(path):
+        return gzip.open(path, "rb")
+    return path.open("rb")
+
+
+def read_transcript_bytes(path: Path) -> bytes:
+    with open_transcript(path) as f:
+        return f.read()
+
+
+def read_transcript_text(path: Path) -> str:
+    return decode_transcript(read_transcript_bytes(path))
+
+
+def decode_transcript(data: bytes) -> str:
+    match = encoding_pattern.search(data.split(b"\n", 1)[0])
+    encoding = match.group(1).decode() if match else "utf-8"
+    return data.decode(encoding)
+
+
+def read_transcript(path: Path) -> Transcript:
+    return Transcript.model_validate_xml(read_transcript_text(path))
+
+
+def target_path(path: Path, compress: bool) -> Path:
+    return compressed_path(path) if compress else logical_path(path)
+
+
+@contextmanager
+def transcript_writer(
+    path: Path, compress: Optional[bool] = None
+) -> Iterator[IO[bytes]]:
+    """
+    File to write the transcript for a plain .xml path to in pieces.
+    Everything goes to a temporary file that only replaces the stored copy
+    once the block completes, so an error or crash part way through leaves
+    any previous copy alone. Any copy in the other form is then removed so
+    there is only one per version.
+    """
+    if compress is None:
+        compress = COMPRESS_TRANSCRIPTS
+    target = target_path(path, compress)
+    other = target_path(path, not compress)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + ".part")
+    try:
+        with partial.open("wb") as raw:
+            if compress:
+                # no file name or time in the header, so the same content
+                # always gives the same bytes
+                with gzip.GzipFile(
+                    filename="",
+                    mode="wb",
+                    fileobj=raw,
+                    compresslevel=compress_level,
+                    mtime=0,
+                ) as f:
+                    yield f
+            else:
+                yield raw
+            raw.flush()
+            os.fsync(raw.fileno())
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    os.replace(partial, target)
+    other.unlink(missing_ok=True)
+
+
+def write_transcript(path: Path, data: bytes, compress: Optional[bool] = None) -> Path:
+    """
+    Store a transcript for a plain .xml path, returning where it was written
+    """
+    if compress is None:
+        compress = COMPRESS_TRANSCRIPTS
+    with transcript_writer(path, compress) as f:
+        f.write(data)
+    return target_path(path, compress)
+
+
+@dataclass
+class MigrationReport:
+    files: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+
+def migrate_store(root: Path, compress: bool = True) -> MigrationReport:
+    """
+    Convert every transcript under root to (or from) the compressed form.
+    Cache validator sidecars are keyed on the plain name so don't need to move.
+    """
+    report = MigrationReport()
+    pattern = "*.xml" if compress else "*.xml" + compressed_suffix
+    for path in sorted(root.rglob(pattern)):
+        report.bytes_before += path.stat().st_size
+        with open_transcript(path) as source, transcript_writer(path, compress) as f:
+            shutil.copyfileobj(source, f)
+        report.bytes_after += target_path(path, compress).stat().st_size
+        report.files += 1
+    return report
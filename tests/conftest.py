@@ -0,0 +1,139 @@
+import datetime
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+import httpx
+import pytest
+
+from parl_motion_detector.downloader import (
+    ClientSettings,
+    clear_index_cache,
+    clients,
+    configure_client,
+    get_background_loop,
+)
+from parl_motion_detector.providers import LocalStoreProvider
+
+repo_data = Path(__file__).parent.parent / "data"
+
+sitting_days = {
+    "2018-06-26": "a",
+    "2018-06-27": "b",
+    "2018-06-28": "a",
+}
+
+
+def example_debate(date: str, letter: str, n: int) -> str:
+    gid = f"uk.org.publicwhip/debate/{date}{letter}"
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<publicwhip scraperversion="a" latest="yes">
+<major-heading id="{gid}.{n}.0" nospeaker="true" colnum="{n}" time="" url="">Opposition Day {n}</major-heading>
+<minor-heading id="{gid}.{n}.1" nospeaker="true" colnum="{n}" time="" url="">Cost of Living</minor-heading>
+<speech id="{gid}.{n}.2" speakername="A Person" person_id="uk.org.publicwhip/person/10001" colnum="{n}" time="" url="">
+<p pid="a{n}.2/1">I beg to move,</p>
+<p pid="a{n}.2/2">That this House calls on the Government to do thing {n}.</p>
+</speech>
+<speech id="{gid}.{n + 2}.0" nospeaker="true" colnum="{n + 2}" time="" url="">
+<p pid="a{n + 2}.0/1">Question put.</p>
+</speech>
+<division id="{gid}.{n + 3}.0" nospeaker="true" divdate="{date}" divnumber="{n}" colnum="{n + 3}" time="" url="">
+<divisioncount ayes="1" noes="1" tellerayes="2" tellernoes="2"/>
+<mplist vote="aye"><mpname person_id="uk.org.publicwhip/person/10001" vote="aye">A Person</mpname></mplist>
+<mplist vote="no"><mpname person_id="uk.org.publicwhip/person/10002" vote="no">B Person</mpname></mplist>
+</division>
+<speech id="{gid}.{n + 4}.0" nospeaker="true" colnum="{n + 4}" time="" url="">
+<p pid="a{n + 4}.0/1">Question accordingly agreed to.</p>
+</speech>
+</publicwhip>
+"""
+
+
+def write_debate(data_dir: Path, date: str, letter: str, n: int = 100) -> Path:
+    directory = data_dir / "scrapedxml" / "house-of-commons" / "scrapedxml" / "debates"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"debates{date}{letter}.xml"
+    path.write_text(example_debate(date, letter, n))
+    return path
+
+
+@pytest.fixture
+def example_data_dir(tmp_path: Path) -> Path:
+    """
+    A fresh data dir with a few sitting days and no results yet
+    """
+    (tmp_path / "raw").mkdir()
+    shutil.copy(repo_data / "raw" / "manual_motion_linking.json", tmp_path / "raw")
+    for i, (date, letter) in enumerate(sitting_days.items()):
+        write_debate(tmp_path, date, letter, 100 + i * 10)
+    return tmp_path
+
+
+@pytest.fixture
+def example_provider(example_data_dir: Path) -> LocalStoreProvider:
+    return LocalStoreProvider(example_data_dir / "scrapedxml")
+
+
+@pytest.fixture
+def example_dates() -> list[datetime.date]:
+    return [datetime.date.fromisoformat(x) for x in sitting_days]
+
+
+@dataclass
+class MockResponse:
+    status: int = 200
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+
+    def build(self) -> httpx.Response:
+        headers = {"Content-Length": str(len(self.body)), **self.headers}
+        # a stream rather than content, so it's read like a real response
+        return httpx.Response(
+            self.status, headers=headers, stream=httpx.ByteStream(self.body)
+        )
+
+
+@dataclass
+class MockServer:
+    """
+    Canned responses for the shared download client, by URL.
+    Each URL's responses are used in turn, and the last one repeats.
+    Anything else is a 404.
+    """
+
+    responses: dict[str, list[MockResponse]] = field(default_factory=dict)
+    requests: list[httpx.Request] = field(default_factory=list)
+
+    def add(self, url: str, *responses: MockResponse):
+        self.responses.setdefault(url, []).extend(responses)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        queue = self.responses.get(str(request.url))
+        if not queue:
+            return httpx.Response(404)
+        return (queue.pop(0) if len(queue) > 1 else queue[0]).build()
+
+    def count(self, url: Optional[str] = None) -> int:
+        return sum(url is None or str(x.url) == url for x in self.requests)
+
+
+@pytest.fixture
+def mock_server() -> Iterator[MockServer]:
+    """
+    Point the shared download client at a MockServer, with no waiting between tries
+    """
+    server = MockServer()
+    configure_client(
+        ClientSettings(
+            requests_per_second=10_000, burst=10_000, backoff_base=0, backoff_max=0
+        )
+    )
+    clear_index_cache()
+    clients[get_background_loop()] = httpx.AsyncClient(
+        transport=httpx.MockTransport(server.handle)
+    )
+    yield server
+    configure_client(ClientSettings())
+    clear_index_cache()
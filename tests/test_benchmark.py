@@ -0,0 +1,94 @@
+import datetime
+import shutil
+from pathlib import Path
+
+from parl_motion_detector.benchmark import (
+    BenchmarkReport,
+    DateBenchmark,
+    benchmark_stages,
+    run_benchmark,
+)
+
+
+def report(
+    seconds: dict[str, dict[str, float]], decisions: int = 10
+) -> BenchmarkReport:
+    result = BenchmarkReport(dates=list(seconds), paragraphs=0, decisions=0)
+    for date, stage_seconds in seconds.items():
+        result.by_date[date] = DateBenchmark.from_seconds(
+            date, 100, decisions, stage_seconds
+        )
+    return result
+
+
+def test_regressions_are_relative_to_the_reference_stage():
+    baseline = report({"2024-01-01": {"parse": 1.0, "get_motions": 1.0}})
+
+    # a machine half as fast slows every stage equally, which isn't a regression
+    slower_machine = report({"2024-01-01": {"parse": 2.0, "get_motions": 2.0}})
+    assert slower_machine.regressions(baseline, threshold=0.25) == []
+
+    # get_motions slowing down on its own is
+    slower_stage = report({"2024-01-01": {"parse": 1.0, "get_motions": 1.5}})
+    regressions = slower_stage.regressions(baseline, threshold=0.25)
+    assert {(x.date, x.stage) for x in regressions} == {("2024-01-01", "get_motions")}
+    assert {x.metric for x in regressions} == {
+        "paragraphs_per_second",
+        "decisions_per_second",
+    }
+    assert regressions[0].current < regressions[0].baseline
+
+    # within the threshold
+    assert slower_stage.regressions(baseline, threshold=0.5) == []
+
+
+def test_regressions_check_decisions_per_second():
+    baseline = report({"2024-01-01": {"parse": 1.0, "assign": 1.0}})
+    fewer_decisions = report({"2024-01-01": {"parse": 1.0, "assign": 1.0}}, decisions=5)
+    regressions = fewer_decisions.regressions(baseline, threshold=0.25)
+    assert [(x.stage, x.metric) for x in regressions] == [
+        ("assign", "decisions_per_second")
+    ]
+
+
+def test_regressions_are_checked_per_date():
+    baseline = report(
+        {
+            "2024-01-01": {"parse": 1.0, "assign": 1.0},
+            "2024-01-02": {"parse": 1.0, "assign": 1.0},
+        }
+    )
+    # one date much slower, hidden in the total by the other getting faster
+    current = report(
+        {
+            "2024-01-01": {"parse": 1.0, "assign": 0.5},
+            "2024-01-02": {"parse": 1.0, "assign": 1.5},
+        }
+    )
+    regressions = current.regressions(baseline, threshold=0.25)
+    assert {x.date for x in regressions} == {"2024-01-02"}
+    # dates missing from the baseline are skipped
+    assert current.regressions(report({}), threshold=0.25) == []
+
+
+def test_run_benchmark_reports_each_date(
+    example_data_dir: Path, example_dates: list[datetime.date], tmp_path: Path
+):
+    fixtures = tmp_path / "xml"
+    shutil.copytree(
+        example_data_dir / "scrapedxml" / "house-of-commons" / "scrapedxml" / "debates",
+        fixtures,
+    )
+    dates = [x.isoformat() for x in example_dates]
+    result = run_benchmark(
+        dates, repeats=1, fixtures=fixtures, data_dir=example_data_dir
+    )
+    assert list(result.by_date) == dates
+    for date in result.by_date.values():
+        assert list(date.stages) == benchmark_stages
+        assert date.paragraphs > 0
+        assert date.decisions > 0
+    assert result.paragraphs == sum(x.paragraphs for x in result.by_date.values())
+    assert result.stages["assign"].seconds == sum(
+        x.stages["assign"].seconds for x in result.by_date.values()
+    )
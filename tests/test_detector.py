@@ -0,0 +1,116 @@
+import re
+from dataclasses import replace
+
+import pytest
+
+from parl_motion_detector.detector import (
+    ComplexPhrase,
+    DetectorSet,
+    LiteralSet,
+    MemoStats,
+    NormalisedText,
+    PhraseDetector,
+    StartsWith,
+    automaton_min_literals,
+    detector_memo,
+)
+
+
+def test_compiled_criteria_match_as_listed():
+    detector = PhraseDetector(
+        criteria=[
+            "I beg to move",
+            "agreed",
+            re.compile(r"^Resolved,", re.IGNORECASE),
+            re.compile(r"^Ordered,", re.IGNORECASE),
+            re.compile(r"clause \d+", re.IGNORECASE),
+            StartsWith("This Amendment"),
+            ComplexPhrase(
+                positive=PhraseDetector(criteria=["division"]),
+                negative=PhraseDetector(criteria=["deferred"]),
+            ),
+        ]
+    )
+    assert detector("I beg\xa0tomove,")
+    assert detector("Question AGREED to.")
+    assert not detector("Question agre ed to.")
+    assert detector(" ordered, That the Bill")
+    assert not detector("It is Ordered, That")
+    assert detector("New Clause 12")
+    assert detector("this amendment would")
+    assert detector("The House proceeded to a Division.")
+    assert not detector("Deferred division")
+
+    # changing the criteria recompiles them
+    detector.criteria.append("deferred")
+    assert detector("Deferred division")
+
+
+def test_detector_set_checks_each_detector_once():
+    calls = []
+
+    def counted(text: str) -> bool:
+        calls.append(text)
+        return text.endswith(".")
+
+    detectors = DetectorSet(
+        agreed=PhraseDetector(criteria=["agreed to"]),
+        full_stop=PhraseDetector(criteria=[counted]),
+    )
+    hits = detectors("Question\xa0put and agreed to.")
+    assert hits["agreed"]
+    assert hits["full_stop"] and hits["full_stop"]
+    assert calls == ["Question put and agreed to."]
+    assert not detectors(None)["agreed"]
+
+
+def test_normalised_text_is_shared_between_detectors():
+    text = NormalisedText(" This\xa0Amendment would ")
+    assert text.lower == "this amendment would"
+    assert text.lower_no_space == "thisamendmentwould"
+    assert StartsWith("this amendment")(text) is False
+    assert PhraseDetector(criteria=[StartsWith(" this amendment")])(text)
+
+    nbsp = ComplexPhrase(
+        positive=PhraseDetector(criteria=["\xa0amendment"]),
+        negative=PhraseDetector(criteria=["probing"]),
+    )
+    # a ComplexPhrase on its own sees the text before spaces are replaced
+    assert nbsp(text) and nbsp(" This\xa0Amendment would ")
+    assert not PhraseDetector(criteria=[nbsp])(text)
+
+
+def test_memo_reuses_results_until_criteria_change():
+    detector = PhraseDetector(criteria=["agreed to"])
+    start = replace(detector_memo.stats)
+
+    assert detector("Question put and agreed to.")
+    assert detector("Question\xa0put and agreed to.")
+    assert (detector_memo.stats - start).hits == 1
+
+    detector.criteria[0] = "negatived"
+    assert not detector("Question put and agreed to.")
+    assert (detector_memo.stats - start).misses == 2
+    assert not detector("Question put and agreed to. " * 20)
+    assert detector_memo.stats - start == MemoStats(hits=1, misses=2)
+
+
+@pytest.mark.parametrize("automaton", [True, False])
+def test_literal_set_with_and_without_automaton(
+    monkeypatch: pytest.MonkeyPatch, automaton: bool
+):
+    if automaton:
+        pytest.importorskip("ahocorasick")
+    else:
+        monkeypatch.setattr("parl_motion_detector.detector.ahocorasick", None)
+    literals = [f"phrase {i}." for i in range(automaton_min_literals)]
+    literal_set = LiteralSet(literals)
+    assert (literal_set.automaton is not None) == automaton
+    assert literal_set.search("a phrase 12. here")
+    assert not literal_set.search("a phrase 12 here")
+    assert not LiteralSet(literals[:1]).search("phrase 2.")
+    assert LiteralSet(literals + [""]).search("anything")
+
+    detector = PhraseDetector(criteria=literals)
+    assert detector("Phrase 3. again")
+    assert not detector("Phrase three")
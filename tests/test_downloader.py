@@ -0,0 +1,375 @@
+import base64
+import datetime
+import hashlib
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+import pytest
+from conftest import MockResponse, MockServer
+from mysoc_validator.models.transcripts import Chamber
+
+from parl_motion_detector.downloader import (
+    CacheValidators,
+    ClientSettings,
+    IncompleteDownloadError,
+    TransientDownloadError,
+    async_request,
+    backoff_delay,
+    check_integrity,
+    clear_index_cache,
+    download_file,
+    get_bucket,
+    get_xmls_from_index,
+    iter_prefetch,
+    parse_dated_index,
+    prefetch_range,
+    run_sync,
+    share_rate_limit,
+)
+from parl_motion_detector.providers import get_manager
+from parl_motion_detector.transcript_store import (
+    TranscriptUnavailableError,
+    read_transcript_bytes,
+    stored_path,
+)
+
+defaults = ClientSettings()
+
+listing_url = "https://www.theyworkforyou.com/pwdata/scrapedxml/debates/"
+url = listing_url + "debates2024-01-01a.xml"
+day = datetime.date(2024, 1, 1)
+
+
+def listing(*names: str) -> MockResponse:
+    links = "".join(f'<a href="{name}">{name}</a>\n' for name in names)
+    return MockResponse(200, f"<html><body>{links}</body></html>".encode())
+
+
+listing_html = b"""<html><head><title>Index of /pwdata/scrapedxml/debates</title></head>
+<body><pre><a href="?C=N;O=D">Name</a>
+<a href="/pwdata/scrapedxml/">Parent Directory</a>
+<a href="changedates.txt">changedates.txt</a>          2024-01-03 09:12  1.2K
+<a href="debates2024-01-01b.xml">debates2024-01-01b.xml</a>   2024-01-03 09:12  812K
+<a href="debates2024-01-01a.xml">debates2024-01-01a.xml</a>   2024-01-02 09:12  806K
+<a href="debates2024-01-02.xml">debates2024-01-02.xml</a>    2024-01-02 21:40  655K
+<a href="debates2024-01-03a.xml.bz2">debates2024-01-03a.xml.bz2</a> 2024-01-03 21:40  98K
+<a href="westminhall2024-01-01a.xml">westminhall2024-01-01a.xml</a> 2024-01-02 09:12  120K
+<a href="debates2024-01-04!.xml">debates2024-01-04!.xml</a>   2024-01-04 09:12  1K
+</pre></body></html>
+"""
+
+
+def transcript(version: str) -> bytes:
+    return f'<?xml version="1.0"?><publicwhip scraperversion="{version}"/>'.encode()
+
+
+def request(url: str = url) -> httpx.Response:
+    return run_sync(async_request("GET", url))
+
+
+def test_unresolvable_host_is_not_retried():
+    start = time.perf_counter()
+    with pytest.raises(TransientDownloadError, match="after 1 attempts"):
+        # .invalid never resolves (RFC 6761)
+        run_sync(async_request("GET", "https://transcripts.invalid/"))
+    assert time.perf_counter() - start < 5
+
+
+def test_retry_after_is_honoured(
+    mock_server: MockServer, monkeypatch: pytest.MonkeyPatch
+):
+    delays = []
+
+    def record_delay(attempt: int, response: Optional[httpx.Response] = None):
+        delays.append(backoff_delay(attempt, response))
+        return 0
+
+    monkeypatch.setattr("parl_motion_detector.downloader.backoff_delay", record_delay)
+    monkeypatch.setattr(
+        "parl_motion_detector.downloader.client_settings.backoff_max", 60.0
+    )
+    mock_server.add(
+        url, MockResponse(429, headers={"Retry-After": "7"}), MockResponse(200)
+    )
+    assert request().status_code == 200
+    assert mock_server.count(url) == 2
+    assert delays == [7.0]
+
+
+def test_server_errors_back_off_then_give_up(mock_server: MockServer):
+    mock_server.add(url, MockResponse(503), MockResponse(502), MockResponse(200))
+    assert request().status_code == 200
+    assert mock_server.count(url) == 3
+
+    attempts = defaults.max_retries + 1
+    other = url.replace("01a", "02a")
+    mock_server.add(other, MockResponse(500))
+    with pytest.raises(TransientDownloadError, match=f"after {attempts} attempts"):
+        request(other)
+    assert mock_server.count(other) == attempts
+
+
+def test_backoff_grows_and_is_capped():
+    settings = ClientSettings()
+    for attempt in range(10):
+        cap = min(settings.backoff_max, settings.backoff_base * 2**attempt)
+        assert 0 <= backoff_delay(attempt) <= cap
+
+
+@pytest.mark.parametrize(
+    "status, error",
+    [
+        (404, FileNotFoundError),
+        (410, FileNotFoundError),
+        (403, TranscriptUnavailableError),
+        (503, TransientDownloadError),
+    ],
+)
+def test_not_found_and_unavailable_are_told_apart(
+    mock_server: MockServer, tmp_path: Path, status: int, error: type
+):
+    mock_server.add(url, MockResponse(status))
+    with pytest.raises(error) as raised:
+        download_file(url, tmp_path / "debates2024-01-01a.xml")
+    if error is TranscriptUnavailableError:
+        assert not isinstance(raised.value, TransientDownloadError)
+    # only server errors are worth asking again
+    assert mock_server.count(url) == (defaults.max_retries + 1 if status == 503 else 1)
+    assert not list(tmp_path.iterdir())
+
+
+def test_cut_short_bodies_are_not_retried_per_request(
+    mock_server: MockServer, tmp_path: Path
+):
+    # every body is cut short, so each attempt's request succeeds
+    # but the download as a whole gives up after body_retries
+    mock_server.add(url, MockResponse(200, b"<publicwhip>", {"Content-Length": "99"}))
+    with pytest.raises(TransientDownloadError):
+        download_file(url, tmp_path / "debates2024-01-01a.xml")
+    assert mock_server.count(url) == defaults.body_retries + 1
+
+
+def received(body: bytes, sent: bytes, headers: dict[str, str]) -> httpx.Response:
+    """
+    A response that has been read, with sent standing in for the body the
+    headers describe
+    """
+    digest = base64.b64encode(hashlib.sha256(sent).digest()).decode()
+    response = httpx.Response(
+        200,
+        headers={"Repr-Digest": f"sha-256=:{digest}:", **headers},
+        stream=httpx.ByteStream(body),
+        request=httpx.Request("GET", url),
+    )
+    response.read()
+    return response
+
+
+def test_check_integrity():
+    body = transcript("a")
+    check_integrity(received(body, body, {}), hashlib.sha256(body).digest())
+
+    short = received(body[:10], body, {"Content-Length": str(len(body))})
+    with pytest.raises(IncompleteDownloadError, match="sent 10 bytes"):
+        check_integrity(short, hashlib.sha256(body[:10]).digest())
+
+    altered = body.replace(b"a", b"b")
+    mismatch = received(altered, body, {})
+    with pytest.raises(IncompleteDownloadError, match="digest"):
+        check_integrity(mismatch, hashlib.sha256(altered).digest())
+    # the digest is of the encoded bytes, so can't be checked after decoding
+    encoded = received(altered, body, {"Content-Encoding": "br"})
+    check_integrity(encoded, hashlib.sha256(altered).digest())
+
+
+def test_failed_check_keeps_previous_copy(mock_server: MockServer, tmp_path: Path):
+    body = transcript("a")
+    digest = base64.b64encode(hashlib.sha256(body).digest()).decode()
+    bad_digest = {"Repr-Digest": f"sha-256=:{digest}:"}
+    mock_server.add(
+        url,
+        MockResponse(200, body, {"ETag": '"v1"'}),
+        *[MockResponse(200, transcript("b"), bad_digest)] * defaults.body_retries,
+        MockResponse(200, transcript("b"), {"Content-Length": "9999"}),
+    )
+    file_path = tmp_path / "debates2024-01-01a.xml"
+    assert download_file(url, file_path)
+    stored = stored_path(file_path)
+    assert stored is not None
+    sidecar = CacheValidators.sidecar_path(file_path).read_text()
+
+    with pytest.raises(TransientDownloadError):
+        download_file(url, file_path)
+    assert read_transcript_bytes(stored) == body
+    assert CacheValidators.sidecar_path(file_path).read_text() == sidecar
+    assert [x.name for x in tmp_path.iterdir()] == sorted(
+        [stored.name, CacheValidators.sidecar_path(file_path).name]
+    )
+
+
+def test_workers_share_the_rate_limit():
+    try:
+        share_rate_limit(4)
+        bucket = get_bucket()
+        assert bucket.rate == defaults.requests_per_second / 4
+        assert bucket.burst == max(1, defaults.burst // 4)
+    finally:
+        share_rate_limit(1)
+    assert get_bucket().rate == defaults.requests_per_second
+
+
+def test_refresh_of_unchanged_day_leaves_it_alone(
+    mock_server: MockServer, tmp_path: Path
+):
+    mock_server.add(listing_url, listing("debates2024-01-01a.xml"))
+    mock_server.add(
+        url,
+        MockResponse(200, transcript("a"), {"ETag": '"v1"'}),
+        MockResponse(304),
+    )
+    manager = get_manager(Chamber.COMMONS)
+    path = manager.get_latest_for_date(day, tmp_path)
+    sidecar = CacheValidators.sidecar_path(path)
+    before = (path.read_bytes(), path.stat().st_mtime_ns, sidecar.read_text())
+
+    assert manager.get_latest_for_date(day, tmp_path, refresh=True) == path
+    assert mock_server.requests[-1].headers["If-None-Match"] == '"v1"'
+    assert (path.read_bytes(), path.stat().st_mtime_ns, sidecar.read_text()) == before
+
+
+def test_refresh_downloads_new_version_alongside_old(
+    mock_server: MockServer, tmp_path: Path
+):
+    mock_server.add(listing_url, listing("debates2024-01-01a.xml"))
+    mock_server.add(url, MockResponse(200, transcript("a")))
+    manager = get_manager(Chamber.COMMONS)
+    first = manager.get_latest_for_date(day, tmp_path)
+
+    clear_index_cache()
+    mock_server.responses[listing_url] = [
+        listing("debates2024-01-01a.xml", "debates2024-01-01b.xml")
+    ]
+    mock_server.add(
+        listing_url + "debates2024-01-01b.xml", MockResponse(200, transcript("b"))
+    )
+    latest = manager.get_latest_for_date(day, tmp_path, refresh=True)
+    assert latest.name == "debates2024-01-01b.xml.gz"
+    assert manager.local_versions(day, tmp_path) == [first, latest]
+    assert CacheValidators.sidecar_path(first).exists()
+    assert CacheValidators.sidecar_path(latest).exists()
+
+
+def test_refresh_keeps_local_copy_when_server_unreachable(
+    mock_server: MockServer, tmp_path: Path
+):
+    mock_server.add(listing_url, listing("debates2024-01-01a.xml"))
+    mock_server.add(url, MockResponse(200, transcript("a")))
+    manager = get_manager(Chamber.COMMONS)
+    first = manager.get_latest_for_date(day, tmp_path)
+
+    clear_index_cache()
+    mock_server.responses[listing_url] = [MockResponse(503)]
+    assert manager.get_latest_for_date(day, tmp_path, refresh=True) == first
+
+    # with nothing stored there's nothing to fall back on
+    with pytest.raises(TransientDownloadError):
+        manager.get_latest_for_date(day + datetime.timedelta(days=1), tmp_path)
+
+
+def test_parse_dated_index(mock_server: MockServer):
+    mock_server.add(listing_url, MockResponse(200, listing_html))
+    links = get_xmls_from_index(listing_url)
+    assert "changedates.txt" not in links
+    assert "debates2024-01-03a.xml.bz2" not in links
+
+    assert parse_dated_index(links, "debates") == {
+        "2024-01-01": ["debates2024-01-01a.xml", "debates2024-01-01b.xml"],
+        "2024-01-02": ["debates2024-01-02.xml"],
+    }
+    assert parse_dated_index(links, "westminhall") == {
+        "2024-01-01": ["westminhall2024-01-01a.xml"]
+    }
+
+
+def test_index_discovery_uses_listing_once(mock_server: MockServer):
+    mock_server.add(listing_url, MockResponse(200, listing_html))
+    manager = get_manager(Chamber.COMMONS)
+
+    assert manager.latest_url(day) == listing_url + "debates2024-01-01b.xml"
+    assert manager.latest_url(datetime.date(2024, 1, 2)) == (
+        listing_url + "debates2024-01-02.xml"
+    )
+    assert manager.latest_url(datetime.date(2024, 1, 3)) is None
+    # every lookup after the first is answered from the cached listing
+    assert mock_server.count() == 1
+
+    clear_index_cache()
+    manager.latest_url(day)
+    assert mock_server.count() == 2
+
+
+def test_index_discovery_falls_back_to_probes(mock_server: MockServer):
+    mock_server.add(listing_url, MockResponse(404))
+    mock_server.add(url, MockResponse(200))
+    mock_server.add(listing_url + "debates2024-01-01c.xml", MockResponse(200))
+    manager = get_manager(Chamber.COMMONS)
+
+    assert manager.latest_url(day) == listing_url + "debates2024-01-01c.xml"
+    assert all(request.method == "HEAD" for request in mock_server.requests[1:])
+
+
+def prefetch_server(mock_server: MockServer) -> list[datetime.date]:
+    """
+    Five days: two plain, one replaced by a b version, one with no sitting
+    and one the server won't serve
+    """
+    names = [
+        "debates2024-01-01a.xml",
+        "debates2024-01-02a.xml",
+        "debates2024-01-04a.xml",
+        "debates2024-01-04b.xml",
+        "debates2024-01-05a.xml",
+    ]
+    mock_server.add(listing_url, listing(*names))
+    for name in names[:-1]:
+        mock_server.add(listing_url + name, MockResponse(200, transcript(name)))
+    mock_server.add(listing_url + names[-1], MockResponse(503))
+    return [day + datetime.timedelta(days=i) for i in range(5)]
+
+
+@pytest.mark.parametrize("concurrency", [1, 8])
+def test_iter_prefetch_yields_each_date_once(
+    mock_server: MockServer, tmp_path: Path, concurrency: int
+):
+    dates = prefetch_server(mock_server)
+    # one day is already stored, so is ready without a request
+    stored = tmp_path / "scrapedxml" / "debates" / "debates2024-01-02a.xml"
+    stored.parent.mkdir(parents=True)
+    stored.write_bytes(transcript("stored"))
+
+    landed = dict(iter_prefetch(dates, download_path=tmp_path, concurrency=concurrency))
+    assert sorted(landed) == dates
+    assert len(mock_server.requests) == 1 + 2 + defaults.max_retries + 1
+    assert landed[dates[1]] == stored
+    assert landed[dates[0]].name == "debates2024-01-01a.xml.gz"
+    assert landed[dates[3]].name == "debates2024-01-04b.xml.gz"
+    # no sitting, and a day the server kept failing on, don't hold up the rest
+    assert landed[dates[2]] is None
+    assert landed[dates[4]] is None
+    assert mock_server.count(listing_url + "debates2024-01-04a.xml") == 0
+
+
+def test_prefetch_range_returns_fetched_paths(mock_server: MockServer, tmp_path: Path):
+    dates = prefetch_server(mock_server)
+    paths = prefetch_range(dates[0], dates[-1], download_path=tmp_path)
+    assert [x.name for x in paths] == [
+        "debates2024-01-01a.xml.gz",
+        "debates2024-01-02a.xml.gz",
+        "debates2024-01-04b.xml.gz",
+    ]
+    # a second run has everything it can get already
+    mock_server.requests.clear()
+    assert prefetch_range(dates[0], dates[-1], download_path=tmp_path) == paths
+    assert mock_server.count(listing_url) == 1
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from mysoc_validator.models.transcripts import Chamber
+
+from parl_motion_detector.fixups import (
+    TranscriptFixup,
+    fixups_for_day,
+    get_fixups,
+    load_transcript,
+)
+from parl_motion_detector.providers import FileSource
+from parl_motion_detector.transcript_store import (
+    read_transcript_bytes,
+    write_transcript,
+)
+
+example_xml = """<?xml version="1.0" encoding="UTF-8"?>
+<publicwhip>
+<major-heading id="uk.org.publicwhip/debate/2019-01-01a.1.0" nospeaker="true" colnum="1" time="" url="">Division 21&#10;14</major-heading>
+</publicwhip>
+"""
+
+
+def test_fixups_scope(tmp_path: Path):
+    (tmp_path / "raw").mkdir()
+    fixups = [
+        {"find": "a", "replace": "b"},
+        {"chamber": "scottish-parliament", "find": "c", "replace": "d"},
+        {"chamber": "house-of-commons", "date": "2019-01", "find": "e", "replace": "f"},
+    ]
+    (tmp_path / "raw" / "transcript_fixups.json").write_text(json.dumps(fixups))
+    get_fixups.cache_clear()
+
+    def finds(chamber: Chamber, date: str) -> list[str]:
+        return [x.find for x in fixups_for_day(tmp_path, chamber, date)]
+
+    assert finds(Chamber.COMMONS, "2019-01-02") == ["a", "e"]
+    assert finds(Chamber.COMMONS, "2019-02-01") == ["a"]
+    assert finds(Chamber.SCOTLAND, "2019-01-02") == ["a", "c"]
+
+
+def test_load_transcript_leaves_stored_file(tmp_path: Path):
+    path = write_transcript(tmp_path / "debates2019-01-01a.xml", example_xml.encode())
+    stored = path.read_bytes()
+
+    fixup = TranscriptFixup(find="21&#10;14", replace="2114")
+    transcript = load_transcript(FileSource(path), [fixup])
+    assert transcript.items[0].content.text == "Division 2114"
+    assert (
+        load_transcript(FileSource(path), []).items[0].content.text != "Division 2114"
+    )
+    assert path.read_bytes() == stored
+    assert read_transcript_bytes(path) == example_xml.encode()
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from mysoc_validator.models.transcripts import Chamber
+
+from parl_motion_detector.agreements import Agreement, DivisionHolder
+from parl_motion_detector.interim import InterimFormat
+from parl_motion_detector.mapper import ResultsHolder
+from parl_motion_detector.motions import Flag, Motion
+
+
+def example_results() -> ResultsHolder:
+    motion = Motion(
+        date="2024-04-24",
+        chamber=Chamber.COMMONS,
+        speech_id="uk.org.publicwhip/debate/2024-04-24b.100.1",
+        speech_start_pid="b100.1/2",
+        motion_title="Example Bill: Second Reading",
+        motion_lines=["I beg to move,", "That the Bill be now read a Second time."],
+        flags=[Flag.ONE_LINE_MOTION, Flag.SECOND_STAGE],
+    )
+    division = DivisionHolder(
+        date="2024-04-24",
+        major_heading_id="uk.org.publicwhip/debate/2024-04-24b.100.0",
+        minor_heading_id="",
+        minor_heading_text="",
+        chamber=Chamber.COMMONS,
+        speech_id="uk.org.publicwhip/debate/2024-04-24b.120.0",
+        preceding_speech="Question put.",
+        after_speech="Question accordingly agreed to.",
+        motion=motion,
+        motion_assignment_reason="single motion and decision",
+    )
+    agreement = Agreement(
+        date="2024-04-24",
+        major_heading_id="uk.org.publicwhip/debate/2024-04-24b.100.0",
+        minor_heading_id="",
+        speech_id="uk.org.publicwhip/debate/2024-04-24b.121.0",
+        chamber=Chamber.COMMONS,
+        paragraph_pid="b121.0/1",
+        agreed_text="Question accordingly agreed to.",
+        preceeding_text="",
+        after_text="Bill accordingly read a Second time.",
+        motion=motion,
+    )
+    unassigned = agreement.model_copy(update={"motion": None, "speech_id": "x"})
+    return ResultsHolder(
+        date="2024-04-24",
+        chamber=Chamber.COMMONS,
+        division_motions=[division],
+        agreement_motions=[agreement, unassigned],
+    )
+
+
+def test_interim_round_trip(tmp_path: Path):
+    results = example_results()
+    for interim_format in InterimFormat:
+        results.to_data_dir(tmp_path, interim_format)
+        loaded = ResultsHolder.from_data_dir(tmp_path, results.date, results.chamber)
+        assert loaded.model_dump_json() == results.model_dump_json()
+        # writing one format replaces the other
+        assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from parl_motion_detector.local_index import TranscriptIndex
+from parl_motion_detector.transcript_store import write_transcript
+
+
+def test_index_tracks_new_versions(tmp_path: Path):
+    directory = tmp_path / "scrapedxml" / "debates"
+    write_transcript(directory / "debates2024-01-01.xml", b"<a/>", compress=False)
+    write_transcript(directory / "debates2024-02-01a.xml", b"<b/>")
+    index = TranscriptIndex(tmp_path)
+
+    assert index.dates(directory, 2024) == ["2024-01-01", "2024-02-01"]
+    assert index.versions(directory, "2024-01-01") == [
+        directory / "debates2024-01-01.xml"
+    ]
+
+    # a newer letter version is picked up without being told about it
+    write_transcript(directory / "debates2024-01-01b.xml", b"<c/>")
+    assert index.versions(directory, "2024-01-01", "debates", ["", "a", "b"]) == [
+        directory / "debates2024-01-01.xml",
+        directory / "debates2024-01-01b.xml.gz",
+    ]
+    assert index.versions(directory, "2024-01-01", "daylord") == []
@@ -2,20 +2,32 @@ import datetime
 import json
 from pathlib import Path
 
+import pandas as pd
+import pytest
 from mysoc_validator import Transcript
+from mysoc_validator.models.transcripts import Chamber
 
-from parl_motion_detector.downloader import get_latest_for_date
-from parl_motion_detector.mapper import MotionMapper
+from parl_motion_detector.mapper import MotionMapper, ResultsHolder
+from parl_motion_detector.process import render_year
+from parl_motion_detector.providers import (
+    OFFLINE,
+    LocalStoreProvider,
+    default_provider,
+)
+from parl_motion_detector.transcript_store import TranscriptUnavailableError
 
 debates_path = Path("data")
 tests_path = Path("data") / "tests" / "mapper"
 
 
 def compare_date(debate_date: str):
-    transcript_path = get_latest_for_date(
-        datetime.date.fromisoformat(debate_date), download_path=debates_path
-    )
-    transcript = Transcript.from_xml_path(transcript_path)
+    provider = default_provider(debates_path / "scrapedxml")
+    try:
+        transcript = provider.latest(datetime.date.fromisoformat(debate_date)).read()
+    except TranscriptUnavailableError:
+        if OFFLINE:
+            pytest.skip(f"No stored transcript for {debate_date} while offline")
+        raise
 
     mm = MotionMapper(transcript, debate_date, Transcript.Chamber.COMMONS, debates_path)
     mm.assign()
@@ -101,3 +113,52 @@ def test_manual_wildcard_matching():
         "uk.org.publicwhip/debate/2025-11-06e.953.5.6", manual_lookup
     )
     assert result is None
+
+
+agreed_debate = """<?xml version="1.0" encoding="UTF-8"?>
+<publicwhip scraperversion="a" latest="yes">
+<major-heading id="uk.org.publicwhip/debate/2018-06-25a.5.0" nospeaker="true" colnum="5" time="" url="">Backbench Business</major-heading>
+<minor-heading id="uk.org.publicwhip/debate/2018-06-25a.5.1" nospeaker="true" colnum="5" time="" url="">Pensions</minor-heading>
+<speech id="uk.org.publicwhip/debate/2018-06-25a.5.2" speakername="A Person" person_id="uk.org.publicwhip/person/10001" colnum="5" time="" url="">
+<p pid="a5.2/1">I beg to move,</p>
+<p pid="a5.2/2">That this House has considered pensions.</p>
+</speech>
+<speech id="uk.org.publicwhip/debate/2018-06-25a.6.0" nospeaker="true" colnum="6" time="" url="">
+<p pid="a6.0/1">Question put and agreed to.</p>
+</speech>
+</publicwhip>
+"""
+
+
+def test_export_composite_matches_export(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+    tmp_path_factory: pytest.TempPathFactory,
+):
+    # a day with an agreement before the days with divisions
+    debates = example_provider.store_path(Chamber.COMMONS) / "scrapedxml" / "debates"
+    (debates / "debates2018-06-25a.xml").write_text(agreed_debate)
+    dates = [datetime.date(2018, 6, 25), *example_dates]
+    render_year(example_data_dir, dates_in_year=dates, provider=example_provider)
+
+    results = example_data_dir / "interim" / "results"
+    streamed = example_data_dir / "processed" / "parquet"
+    in_memory = tmp_path_factory.mktemp("in_memory")
+    ResultsHolder.from_data_dir_composite(results, "custom", Chamber.COMMONS).export(
+        in_memory
+    )
+
+    for name in ["motions", "division-links", "agreements"]:
+        file_name = f"house-of-commons-custom-{name}.parquet"
+        expected = pd.read_parquet(in_memory / file_name)
+        actual = pd.read_parquet(streamed / file_name)
+        assert len(actual) > 0
+        # rows come out grouped by day rather than all divisions then all agreements
+        columns = list(expected.columns)
+        pd.testing.assert_frame_equal(
+            actual.sort_values(columns, ignore_index=True),
+            expected.sort_values(columns, ignore_index=True),
+        )
+    motions = pd.read_parquet(streamed / "house-of-commons-custom-motions.parquet")
+    assert motions["date"].is_monotonic_increasing
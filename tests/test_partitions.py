@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from parl_motion_detector.partitions import write_partitioned
+from parl_motion_detector.process import move_to_package, package_file_endings
+
+
+def example_links() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "division_gid": [
+                "uk.org.publicwhip/debate/2023-03-01a.10.0",
+                "uk.org.publicwhip/debate/2024-05-01b.20.0",
+                "uk.org.publicwhip/spor/2024-05-29.5.2",
+            ],
+            "motion_gid": ["a", "b", "c"],
+            "chamber": ["house-of-commons", "house-of-commons", "scottish-parliament"],
+        }
+    )
+
+
+def test_partitioned_rewrite(tmp_path: Path):
+    df = example_links()
+    write_partitioned(df, tmp_path)
+    assert len(list(tmp_path.rglob("*.parquet"))) == 3
+
+    table = pq.read_table(tmp_path, filters=[("chamber", "=", "house-of-commons")])
+    assert sorted(table.column("motion_gid").to_pylist()) == ["a", "b"]
+
+    # only the requested partitions are touched, and emptied ones are removed
+    untouched = tmp_path / "chamber=house-of-commons" / "year=2023" / "part-0.parquet"
+    modified = untouched.stat().st_mtime_ns
+    write_partitioned(df.iloc[:2], tmp_path, {("scottish-parliament", 2024)})
+    assert untouched.stat().st_mtime_ns == modified
+    assert not (tmp_path / "chamber=scottish-parliament" / "year=2024").exists()
+
+
+def write_yearly(parquet_dir: Path, chamber: str, year: int, count: int):
+    for file_ending in package_file_endings:
+        pd.DataFrame(
+            {
+                "gid": [f"{chamber}/{year}/{i}" for i in range(count)],
+                "date": [f"{year}-01-{i % 28 + 1:02d}" for i in range(count)],
+                "chamber": chamber,
+            }
+        ).to_parquet(parquet_dir / f"{chamber}-{year}-{file_ending}")
+
+
+def test_partitions_catch_up_after_plain_package_runs(tmp_path: Path):
+    parquet_dir = tmp_path / "processed" / "parquet"
+    parquet_dir.mkdir(parents=True)
+    (tmp_path / "packages" / "parliamentary_motions").mkdir(parents=True)
+    write_yearly(parquet_dir, "house-of-commons", 2023, 5)
+    write_yearly(parquet_dir, "house-of-commons", 2024, 10)
+    move_to_package(tmp_path, changed_only=True, partitioned=True)
+
+    # a day is re-rendered and picked up by a run that doesn't touch the partitions
+    write_yearly(parquet_dir, "house-of-commons", 2024, 8)
+    move_to_package(tmp_path, changed_only=True)
+    move_to_package(tmp_path, changed_only=True, partitioned=True)
+
+    dataset_dir = tmp_path / "processed" / "partitioned" / "motions"
+    package = pd.read_parquet(
+        tmp_path / "packages" / "parliamentary_motions" / "motions.parquet"
+    )
+    assert len(package) == 13
+    assert pq.read_table(dataset_dir).num_rows == 13
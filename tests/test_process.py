@@ -0,0 +1,236 @@
+import datetime
+import json
+import shutil
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import pytest
+from mysoc_validator.models.transcripts import Chamber
+
+from parl_motion_detector import manifest, process
+from parl_motion_detector.downloader import index_cache
+from parl_motion_detector.manifest import (
+    ProcessingManifest,
+    get_ruleset_hash,
+    get_validator_version,
+)
+from parl_motion_detector.process import merge_package_rows, render_year
+from parl_motion_detector.providers import LocalStoreProvider, get_manager
+from parl_motion_detector.sitting_calendar import SittingCalendar
+
+
+def test_workers_on_fresh_data_dir(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+):
+    render_year(
+        example_data_dir,
+        dates_in_year=example_dates,
+        workers=2,
+        provider=example_provider,
+    )
+    results = example_data_dir / "interim" / "results"
+    assert len(list(results.iterdir())) == len(example_dates)
+
+
+@dataclass
+class RemoteOnlyProvider(LocalStoreProvider):
+    """
+    Transcripts that have to be fetched, so none show up as local dates
+    """
+
+    def local_dates(
+        self, chamber: Chamber = Chamber.COMMONS, year: Optional[int] = None
+    ) -> list[str]:
+        return []
+
+
+def mark_not_sitting(data_dir: Path, dates: list[datetime.date]):
+    calendar = SittingCalendar(
+        chamber=Chamber.COMMONS, not_sitting={x.isoformat() for x in dates}
+    )
+    calendar.to_data_dir(data_dir)
+
+
+def test_late_local_transcript_is_rechecked(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+):
+    mark_not_sitting(example_data_dir, example_dates)
+    render_year(
+        example_data_dir, dates_in_year=example_dates, provider=example_provider
+    )
+    results = example_data_dir / "interim" / "results"
+    assert len(list(results.iterdir())) == len(example_dates)
+    calendar = SittingCalendar.from_data_dir(example_data_dir, Chamber.COMMONS)
+    assert not calendar.not_sitting
+
+
+def test_force_rechecks_not_sitting_days(
+    example_data_dir: Path, example_dates: list[datetime.date]
+):
+    provider = RemoteOnlyProvider(example_data_dir / "scrapedxml")
+    mark_not_sitting(example_data_dir, example_dates)
+    render_year(example_data_dir, dates_in_year=example_dates, provider=provider)
+    assert not (example_data_dir / "interim" / "results").exists()
+
+    render_year(
+        example_data_dir, dates_in_year=example_dates, provider=provider, force=True
+    )
+    results = example_data_dir / "interim" / "results"
+    assert len(list(results.iterdir())) == len(example_dates)
+
+
+def test_render_year_refetches_index(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+):
+    index_cache["https://example.org/debates/"] = ["debates2018-06-26a.xml"]
+    render_year(
+        example_data_dir, dates_in_year=example_dates, provider=example_provider
+    )
+    assert not index_cache
+
+
+def test_manifest_records_validator_version(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+):
+    render_year(
+        example_data_dir, dates_in_year=example_dates, provider=example_provider
+    )
+    manifest = ProcessingManifest.from_data_dir(example_data_dir, Chamber.COMMONS)
+    assert len(manifest.days) == len(example_dates)
+    for inputs in manifest.days.values():
+        assert inputs.validator == get_validator_version()
+        # only Scottish Parliament days depend on the SP motions
+        assert inputs.sp_motions == ""
+
+
+def test_offline_marks_checked_days_not_sitting(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+):
+    checked, unchecked = [x + datetime.timedelta(days=3) for x in example_dates[:2]]
+    get_manager(Chamber.COMMONS).record_missing(
+        checked, example_provider.store_path(Chamber.COMMONS)
+    )
+    render_year(
+        example_data_dir,
+        dates_in_year=[*example_dates, checked, unchecked],
+        provider=example_provider,
+    )
+    calendar = SittingCalendar.from_data_dir(example_data_dir, Chamber.COMMONS)
+    assert calendar.not_sitting == {checked.isoformat()}
+
+
+def count_parsed(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """
+    Names of the transcripts parsed by render_day from now on
+    """
+    parsed = []
+    load_transcript = process.load_transcript
+
+    def counting(source, fixups):
+        parsed.append(source.name)
+        return load_transcript(source, fixups)
+
+    monkeypatch.setattr(process, "load_transcript", counting)
+    return parsed
+
+
+def test_unchanged_days_are_skipped(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    parsed = count_parsed(monkeypatch)
+    render = partial(
+        render_year,
+        example_data_dir,
+        dates_in_year=example_dates,
+        provider=example_provider,
+    )
+    render()
+    assert len(parsed) == len(example_dates)
+    render()
+    assert len(parsed) == len(example_dates)
+
+    # editing the manual links (in the same process) reprocesses every day
+    links_path = example_data_dir / "raw" / "manual_motion_linking.json"
+    links_path.write_text(json.dumps(json.loads(links_path.read_text()), indent=1))
+    render()
+    assert len(parsed) == 2 * len(example_dates)
+    render()
+    assert len(parsed) == 2 * len(example_dates)
+
+
+def test_ruleset_change_reprocesses_days(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path_factory: pytest.TempPathFactory,
+):
+    parsed = count_parsed(monkeypatch)
+    render = partial(
+        render_year,
+        example_data_dir,
+        dates_in_year=example_dates,
+        provider=example_provider,
+    )
+    render()
+
+    package_dir = tmp_path_factory.mktemp("package")
+    for module in manifest.ruleset_modules:
+        shutil.copy(manifest.package_dir / module, package_dir)
+    with (package_dir / "motions.py").open("a") as f:
+        f.write("\n# a change to the rules\n")
+    monkeypatch.setattr(manifest, "package_dir", package_dir)
+    get_ruleset_hash.cache_clear()
+    try:
+        render()
+    finally:
+        monkeypatch.undo()
+        get_ruleset_hash.cache_clear()
+    assert len(parsed) == 2 * len(example_dates)
+
+
+def test_merge_package_rows():
+    # each yearly file has its own 0.. index, so the labels overlap
+    years = [
+        pd.DataFrame(
+            {
+                "gid": ["sp/2023-06-01.3", "sp/2023-06-01.1"],
+                "motion_title": ["Decision Time", "Budget"],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "gid": ["sp/2023-06-01.3", "sp/2023-06-01.1", "sp/2024-01-01.1"],
+                "motion_title": ["Fisheries", "Budget", "Decision Time"],
+            }
+        ),
+    ]
+    merged = merge_package_rows(pd.concat(years), "motions.parquet")
+    assert merged.to_dict("list") == {
+        "gid": ["sp/2023-06-01.1", "sp/2023-06-01.3", "sp/2024-01-01.1"],
+        # a Decision Time title only gives way to a better one for the same id
+        "motion_title": ["Budget", "Fisheries", "Decision Time"],
+    }
+
+    # identical rows from two files are merged, conflicting ones are an error
+    links = pd.DataFrame({"gid": ["d/1", "d/2"], "division_gid": ["x/1", "x/2"]})
+    assert merge_package_rows(pd.concat([links, links]), "x").equals(links)
+    conflicting = years[1].assign(motion_title=["Fisheries (amended)", "Budget", ""])
+    with pytest.raises(ValueError, match="sp/2023-06-01.3"):
+        merge_package_rows(pd.concat([*years, conflicting]), "motions.parquet")
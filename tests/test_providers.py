@@ -0,0 +1,136 @@
+import datetime
+from pathlib import Path
+
+import pytest
+from conftest import MockResponse, MockServer
+
+from parl_motion_detector import providers
+from parl_motion_detector.bundles import BundleFormat, pack_store
+from parl_motion_detector.providers import (
+    ArchiveProvider,
+    ChainProvider,
+    HTTPProvider,
+    LocalStoreProvider,
+    MemoryProvider,
+    bundle_root,
+    default_provider,
+)
+from parl_motion_detector.transcript_store import (
+    TranscriptUnavailableError,
+    write_transcript,
+)
+
+day = datetime.date(2024, 1, 1)
+
+
+def test_chain_falls_back_on_missing_days(tmp_path: Path):
+    memory = MemoryProvider()
+    memory.add("debates2024-01-01.xml", b"<a/>")
+    memory.add("debates2024-01-01b.xml", b"<b/>")
+    memory.add("daylord2024-01-02.xml", b"<c/>")
+    offline = LocalStoreProvider(tmp_path)
+
+    assert memory.latest(day).read_bytes() == b"<b/>"
+    assert memory.local_dates(year=2024) == ["2024-01-01", "2024-01-02"]
+    with pytest.raises(FileNotFoundError):
+        memory.latest(day + datetime.timedelta(days=1))
+
+    # offline can't say an unchecked day is missing, only that it doesn't have it
+    with pytest.raises(TranscriptUnavailableError):
+        offline.latest(day)
+    assert ChainProvider([offline, memory]).latest(day).name == "debates2024-01-01b.xml"
+    with pytest.raises(TranscriptUnavailableError):
+        ChainProvider([memory, offline]).latest(datetime.date(2024, 1, 3))
+
+
+def test_archive_reads_packed_years(tmp_path: Path):
+    store = tmp_path / "scrapedxml" / "house-of-commons"
+    debates = store / "scrapedxml" / "debates"
+    write_transcript(debates / "debates2023-01-01.xml", b"<a/>")
+    write_transcript(debates / "debates2023-01-01a.xml", b"<b/>", compress=False)
+    write_transcript(debates / "debates2024-01-01.xml", b"<c/>")
+    bundles = tmp_path / "bundles"
+
+    for bundle_format in BundleFormat:
+        written = pack_store(
+            store, bundles / "house-of-commons", [2023, 2024], bundle_format
+        )
+        assert [x.name for x in written] == [
+            f"2023.{bundle_format}",
+            f"2024.{bundle_format}",
+        ]
+        archive = ArchiveProvider(bundles)
+        assert archive.latest(datetime.date(2023, 1, 1)).read_bytes() == b"<b/>"
+        assert archive.local_dates(year=2024) == ["2024-01-01"]
+        for path in written:
+            path.unlink()
+
+
+def test_prefetch_through_providers(mock_server: MockServer, tmp_path: Path):
+    listing_url = "https://www.theyworkforyou.com/pwdata/scrapedxml/debates/"
+    mock_server.add(
+        listing_url,
+        MockResponse(200, b'<a href="debates2024-01-02.xml">debates2024-01-02.xml</a>'),
+    )
+    mock_server.add(listing_url + "debates2024-01-02.xml", MockResponse(200, b"<b/>"))
+    memory = MemoryProvider()
+    memory.add("debates2024-01-01.xml", b"<a/>")
+    dates = [day + datetime.timedelta(days=i) for i in range(3)]
+
+    # providers with nothing to fetch hand the dates straight back
+    assert list(memory.iter_prefetch(dates)) == dates
+
+    chain = ChainProvider([memory, HTTPProvider(tmp_path)])
+    landed = list(chain.iter_prefetch(dates))
+    # held days come first, then the rest as they land
+    assert landed[0] == dates[0]
+    assert sorted(landed) == dates
+    # the day memory holds isn't fetched, and nothing is fetched twice
+    assert mock_server.count() == 2
+    assert chain.latest(dates[1]).read_bytes() == b"<b/>"
+    assert mock_server.count() == 2
+
+
+def test_chain_prefers_newest_version(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    store_root = tmp_path / "scrapedxml"
+    store = store_root / "house-of-commons"
+    debates = store / "scrapedxml" / "debates"
+    write_transcript(debates / "debates2024-01-01a.xml", b"<a/>")
+    write_transcript(debates / "debates2024-01-02a.xml", b"<c/>")
+    pack_store(store, bundle_root(store_root) / "house-of-commons", [2024])
+    # a newer version of one day lands in the store after packing
+    write_transcript(debates / "debates2024-01-01b.xml", b"<b/>")
+
+    monkeypatch.setattr(providers, "OFFLINE", True)
+    provider = default_provider(store_root)
+    assert isinstance(provider, ChainProvider)
+    assert provider.latest(day).read_bytes() == b"<b/>"
+    assert provider.latest(datetime.date(2024, 1, 2)).read_bytes() == b"<c/>"
+
+    # and the other way round, the bundle having the newer version
+    memory = MemoryProvider()
+    memory.add("debates2024-01-01.xml", b"<old/>")
+    archive = ArchiveProvider(bundle_root(store_root))
+    assert ChainProvider([memory, archive]).latest(day).read_bytes() == b"<a/>"
+
+
+def test_offline_knows_checked_days_had_no_sitting(
+    mock_server: MockServer, tmp_path: Path
+):
+    listing_url = "https://www.theyworkforyou.com/pwdata/scrapedxml/debates/"
+    mock_server.add(listing_url, MockResponse(200, b"<html></html>"))
+    recent = datetime.date.today() - datetime.timedelta(days=1)
+    online = HTTPProvider(tmp_path)
+    offline = LocalStoreProvider(tmp_path)
+
+    for date in [day, recent]:
+        with pytest.raises(FileNotFoundError):
+            online.latest(date)
+    with pytest.raises(FileNotFoundError):
+        offline.latest(day)
+    # a transcript may still turn up for a day checked within the grace period
+    with pytest.raises(TranscriptUnavailableError):
+        offline.latest(recent)
+    # and days never checked are just not downloaded
+    with pytest.raises(TranscriptUnavailableError):
+        offline.latest(day + datetime.timedelta(days=1))
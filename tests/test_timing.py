@@ -0,0 +1,77 @@
+import datetime
+import json
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from mysoc_validator.models.transcripts import Chamber
+
+from parl_motion_detector.process import render_year
+from parl_motion_detector.providers import LocalStoreProvider
+from parl_motion_detector.timing import StageTimer, timings_path
+
+
+def test_stage_timer_records_failed_stages():
+    timer = StageTimer("2024-01-01", "house-of-commons")
+    with timer.stage("parse") as stage:
+        stage.items = 3
+    with pytest.raises(ValueError):
+        with timer.stage("assign"):
+            raise ValueError()
+    assert [(x.stage, x.items) for x in timer.timings] == [
+        ("parse", 3),
+        ("assign", None),
+    ]
+    assert all(x.seconds >= 0 for x in timer.timings)
+
+
+def read_timings(path: Path) -> list[tuple[str, str, Optional[int]]]:
+    rows = [json.loads(x) for x in path.read_text().splitlines()]
+    assert all(x["chamber"] == "house-of-commons" and x["seconds"] >= 0 for x in rows)
+    return [(x["date"], x["stage"], x["items"]) for x in rows]
+
+
+def test_render_year_writes_timings(
+    example_data_dir: Path,
+    example_provider: LocalStoreProvider,
+    example_dates: list[datetime.date],
+):
+    render = partial(
+        render_year,
+        example_data_dir,
+        dates_in_year=example_dates,
+        provider=example_provider,
+        timings=True,
+    )
+    path = timings_path(example_data_dir, str(Chamber.COMMONS), "custom")
+    render()
+    # each example day has one motion and one division, and six items to parse
+    assert read_timings(path) == [
+        *[
+            (date.isoformat(), stage, items)
+            for date in example_dates
+            for stage, items in [
+                ("get_transcript", None),
+                ("check_inputs", None),
+                ("parse", 6),
+                ("get_motions", 1),
+                ("get_agreements", 0),
+                ("get_divisions", 1),
+                ("assign", 1),
+                ("write", None),
+            ]
+        ],
+        ("custom", "export_composite", None),
+    ]
+
+    # unchanged days stop once their inputs are checked
+    render()
+    assert read_timings(path) == [
+        *[
+            (date.isoformat(), stage, None)
+            for date in example_dates
+            for stage in ["get_transcript", "check_inputs"]
+        ],
+        ("custom", "export_composite", None),
+    ]
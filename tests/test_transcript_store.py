@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from parl_motion_detector.transcript_store import (
+    migrate_store,
+    read_transcript_text,
+    stored_path,
+    transcript_writer,
+    write_transcript,
+)
+
+example_xml = '<?xml version="1.0" encoding="utf-8"?>\n<publicwhip>£</publicwhip>\n'
+
+
+def test_migrate_round_trip(tmp_path: Path):
+    plain = tmp_path / "debates" / "debates2024-01-01a.xml"
+    write_transcript(plain, example_xml.encode(), compress=False)
+
+    report = migrate_store(tmp_path)
+    assert report.files == 1
+    assert not plain.exists()
+    assert stored_path(plain) == plain.with_name(plain.name + ".gz")
+    assert read_transcript_text(stored_path(plain)) == example_xml
+
+    migrate_store(tmp_path, compress=False)
+    assert stored_path(plain) == plain
+    assert read_transcript_text(plain) == example_xml
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_failed_write_keeps_previous_copy(tmp_path: Path, compress: bool):
+    plain = tmp_path / "debates2024-01-01a.xml"
+    stored = write_transcript(plain, example_xml.encode(), compress=compress)
+
+    with pytest.raises(RuntimeError):
+        with transcript_writer(plain, compress) as f:
+            f.write(b"<publicwhip>")
+            raise RuntimeError("connection dropped")
+    assert list(tmp_path.iterdir()) == [stored]
+    assert read_transcript_text(stored) == example_xml